@@ -1,23 +1,18 @@
 from flask import Blueprint, request, jsonify, session
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
 from backend.app import db
 from backend.models.cart import CartItem
-from backend.models.product import Product
+from backend.models.product import Product, PRODUCT_FIELDS, PRODUCT_PROFILES, product_columns
+from backend.utils.identity import get_current_user_id
+from backend.utils import guest_cart
+from backend.utils.projection import resolve_fields
 import uuid
 
 bp = Blueprint('cart', __name__, url_prefix='/api/cart')
 
-def get_current_user_id():
-    """Helper to get current user ID from session, verifying it exists"""
-    user_id = session.get('user_id')
-    if user_id:
-        # Verify user still exists in database
-        from backend.models.user import User
-        user = User.query.get(user_id)
-        if not user:
-            # User doesn't exist, clear the session
-            session.pop('user_id', None)
-            return None
-    return user_id
+# Upper bound on operations per batch request
+MAX_BATCH_OPERATIONS = 100
 
 def get_or_create_session_id():
     """Get or create a session ID for guest users"""
@@ -33,19 +28,69 @@ def get_cart_identifier():
     else:
         return {'user_id': None, 'session_id': get_or_create_session_id()}
 
-@bp.route('/', methods=['GET'])
-def get_cart():
-    """Get current user's or guest's cart"""
+def claim_guest_cart(user_id):
+    """
+    Move the visitor's guest cart (cookie or cart_items rows) into a user's
+    cart on login or registration. The caller commits.
+    """
+    session_id = session.get('session_id')
+    if guest_cart.read():
+        session_id = get_or_create_session_id()
+        guest_cart.materialize(session_id)
+    session.pop(guest_cart.MATERIALIZED_KEY, None)
+    if session_id:
+        CartItem.merge_guest_cart(session_id, user_id)
+
+def _cart_filter(cart_id):
+    """Criterion selecting the current user's or guest's cart items"""
+    if cart_id['user_id']:
+        return CartItem.user_id == cart_id['user_id']
+    return CartItem.session_id == cart_id['session_id']
+
+def _cart_query(cart_id):
+    """Query over the current user's or guest's cart items"""
+    return CartItem.query.filter(_cart_filter(cart_id))
+
+def _cart_payload(cart_id, fields):
+    """Serialized cart, newest items first, loading only the requested product fields"""
     from sqlalchemy.orm import joinedload
     
-    cart_id = get_cart_identifier()
+    product_loader = joinedload(CartItem.product).load_only(*product_columns(fields))
+    cart_items = _cart_query(cart_id).options(product_loader).order_by(CartItem.created_at.desc()).all()
+    return [item.to_dict(fields) for item in cart_items]
+
+@bp.route('/', methods=['GET'])
+def get_cart():
+    """Get current user's or guest's cart (?fields= / ?profile= select the product fields)"""
+    try:
+        fields = resolve_fields(request.args, PRODUCT_FIELDS, PRODUCT_PROFILES, 'detail')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    if cart_id['user_id']:
-        cart_items = CartItem.query.options(joinedload(CartItem.product)).filter_by(user_id=cart_id['user_id']).order_by(CartItem.created_at.desc()).all()
-    else:
-        cart_items = CartItem.query.options(joinedload(CartItem.product)).filter_by(session_id=cart_id['session_id']).order_by(CartItem.created_at.desc()).all()
+    if guest_cart.active():
+        return jsonify(guest_cart.payload(guest_cart.read(), fields))
+    return jsonify(_cart_payload(get_cart_identifier(), fields))
+
+@bp.route('/summary', methods=['GET'])
+def get_cart_summary():
+    """Item count, subtotal and product ids (newest first) for the header badge, from one aggregate query"""
+    if guest_cart.active():
+        return jsonify(guest_cart.summary(guest_cart.read()))
+    if not get_current_user_id() and 'session_id' not in session:
+        # A guest without a session has no cart yet
+        return jsonify({'count': 0, 'subtotal': 0, 'product_ids': []})
     
-    return jsonify([item.to_dict() for item in cart_items])
+    row = (
+        db.session.query(
+            func.coalesce(func.sum(CartItem.quantity), 0).label('count'),
+            func.coalesce(func.sum(CartItem.quantity * Product.price), 0).label('subtotal'),
+            func.array_agg(aggregate_order_by(CartItem.product_id, CartItem.created_at.desc())).label('product_ids'),
+        )
+        .join(Product, Product.id == CartItem.product_id)
+        .filter(_cart_filter(get_cart_identifier()))
+        .one()
+    )
+    return jsonify({'count': row.count, 'subtotal': row.subtotal, 'product_ids': row.product_ids or []})
 
 @bp.route('/', methods=['POST'])
 def add_to_cart():
@@ -63,6 +108,17 @@ def add_to_cart():
         if not product_id:
             return jsonify({'error': 'Product ID is required'}), 400
         
+        if guest_cart.active():
+            try:
+                operations = _parse_operations({'operations': [{'op': 'add', 'product_id': product_id, 'quantity': quantity}]})
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            items, error = _update_session_cart(operations)
+            if error:
+                return error
+            if items is not None:
+                return jsonify(guest_cart.item_payload(product_id, items[product_id], PRODUCT_PROFILES['detail'])), 201
+        
         product = Product.query.get(product_id)
         if not product:
             return jsonify({'error': 'Product not found'}), 404
@@ -104,6 +160,20 @@ def add_to_cart():
 @bp.route('/<int:item_id>', methods=['PUT'])
 def update_cart_item(item_id):
     """Update cart item quantity"""
+    if guest_cart.active():
+        quantity = (request.get_json(silent=True) or {}).get('quantity')
+        try:
+            operations = _parse_operations({'operations': [{'op': 'set', 'item_id': item_id, 'quantity': quantity}]})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        # A set never grows the cart, so it stays in the cookie; item ids are product ids
+        items, error = _update_session_cart(operations)
+        if error:
+            return error
+        if item_id not in items:
+            return jsonify({'message': 'Item removed'})
+        return jsonify(guest_cart.item_payload(item_id, items[item_id], PRODUCT_PROFILES['detail']))
+    
     cart_id = get_cart_identifier()
     
     cart_item = CartItem.query.get_or_404(item_id)
@@ -133,6 +203,13 @@ def update_cart_item(item_id):
 @bp.route('/<int:item_id>', methods=['DELETE'])
 def remove_from_cart(item_id):
     """Remove item from cart"""
+    if guest_cart.active():
+        # A remove never grows the cart, so it stays in the cookie
+        _, error = _update_session_cart([('remove', None, item_id, None)])
+        if error:
+            return error
+        return jsonify({'message': 'Item removed from cart'}), 200
+    
     cart_id = get_cart_identifier()
     
     cart_item = CartItem.query.get_or_404(item_id)
@@ -150,3 +227,188 @@ def remove_from_cart(item_id):
     
     return jsonify({'message': 'Item removed from cart'}), 200
 
+
+def _parse_operations(data):
+    """
+    Validate a batch request body.
+    
+    Returns:
+        list: (op, product_id, item_id, quantity) tuples
+    
+    Raises:
+        ValueError: On a malformed operation (message names its index)
+    """
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise ValueError('operations must be a non-empty list')
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        raise ValueError(f'At most {MAX_BATCH_OPERATIONS} operations per batch')
+    
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            raise ValueError(f'Operation {index}: must be an object')
+        op = operation.get('op')
+        product_id = operation.get('product_id')
+        item_id = operation.get('item_id')
+        quantity = operation.get('quantity', 1 if op == 'add' else None)
+        
+        if op not in ('add', 'set', 'remove'):
+            raise ValueError(f"Operation {index}: op must be 'add', 'set' or 'remove'")
+        if (product_id is None) == (item_id is None):
+            raise ValueError(f'Operation {index}: give exactly one of product_id or item_id')
+        if op == 'add' and item_id is not None:
+            raise ValueError(f'Operation {index}: add takes a product_id')
+        if any(value is not None and (not isinstance(value, int) or isinstance(value, bool))
+               for value in (product_id, item_id)):
+            raise ValueError(f'Operation {index}: ids must be integers')
+        if op != 'remove' and (not isinstance(quantity, int) or isinstance(quantity, bool)):
+            raise ValueError(f'Operation {index}: quantity must be an integer')
+        if op == 'add' and quantity <= 0:
+            raise ValueError(f'Operation {index}: add quantity must be positive')
+        parsed.append((op, product_id, item_id, quantity))
+    return parsed
+
+def _final_quantities(operations, current, item_products):
+    """
+    Fold batch operations, in order, into the final quantity of every touched product.
+    
+    Args:
+        operations: Output of _parse_operations
+        current: product_id -> quantity now in the cart
+        item_products: cart item id -> product_id
+    
+    Returns:
+        dict: product_id -> quantity (0 removes the item)
+    
+    Raises:
+        LookupError: An operation names an item that isn't in the cart
+    """
+    quantities = {}
+    for index, (op, product_id, item_id, quantity) in enumerate(operations):
+        if item_id is not None:
+            if item_id not in item_products:
+                raise LookupError(f'Operation {index}: cart item {item_id} not found')
+            product_id = item_products[item_id]
+        previous = quantities.get(product_id, current.get(product_id, 0))
+        if op == 'add':
+            quantities[product_id] = previous + quantity
+        elif op == 'set':
+            quantities[product_id] = max(quantity, 0)
+        else:
+            quantities[product_id] = 0
+    return quantities
+
+def _stock_error(quantities, stock):
+    """Error response if a product is missing or short of stock for its final quantity, else None"""
+    missing = sorted(product_id for product_id in quantities if product_id not in stock)
+    if missing:
+        return jsonify({'error': 'Product not found', 'product_ids': missing}), 404
+    short = [
+        {'product_id': product_id, 'requested': quantity, 'available': stock[product_id]}
+        for product_id, quantity in quantities.items()
+        if quantity > 0 and quantity > (stock[product_id] or 0)
+    ]
+    if short:
+        return jsonify({'error': 'Insufficient stock', 'items': short}), 400
+    return None
+
+def _update_session_cart(operations):
+    """
+    Apply operations to a cookie cart; product ids double as its item ids.
+    
+    Returns:
+        tuple: (items, None) on success, (None, error response) on failure, or
+            (None, None) once the cart outgrew the cookie and moved to cart_items
+            (only when the operations added products, so set / remove never return it)
+    """
+    items = guest_cart.read()
+    previous_count = len(items)
+    try:
+        quantities = _final_quantities(operations, items, {product_id: product_id for product_id in items})
+    except LookupError as e:
+        return None, (jsonify({'error': str(e)}), 404)
+    
+    error = _stock_error(quantities, guest_cart.cached_stock(quantities))
+    if error:
+        return None, error
+    
+    for product_id, quantity in quantities.items():
+        if quantity > 0:
+            items[product_id] = quantity
+        else:
+            items.pop(product_id, None)
+    
+    if len(items) > previous_count and not guest_cart.fits(items):
+        guest_cart.materialize(get_or_create_session_id())
+        db.session.commit()
+        return None, None
+    guest_cart.write(items)
+    return items, None
+
+@bp.route('/batch', methods=['POST'])
+def batch_update_cart():
+    """
+    Apply several cart operations in one transaction and return the new cart.
+    
+    Body: {"operations": [{"op": "add", "product_id": 1, "quantity": 2},
+                          {"op": "set", "item_id": 7, "quantity": 3},
+                          {"op": "remove", "product_id": 4}]}
+    Operations apply in order ("set" to 0 removes). Either all succeed or
+    none do. Stock is checked once, for the final quantities.
+    """
+    try:
+        fields = resolve_fields(request.args, PRODUCT_FIELDS, PRODUCT_PROFILES, 'detail')
+        operations = _parse_operations(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if guest_cart.active():
+        items, error = _update_session_cart(operations)
+        if error:
+            return error
+        if items is not None:
+            return jsonify(guest_cart.payload(items, fields))
+        # The cart outgrew the cookie and now lives in cart_items
+    
+    cart_id = get_cart_identifier()
+    try:
+        # Lock the cart's rows so concurrent batches from the same cart serialize
+        items = {item.product_id: item for item in _cart_query(cart_id).with_for_update().all()}
+        try:
+            quantities = _final_quantities(
+                operations,
+                {product_id: item.quantity for product_id, item in items.items()},
+                {item.id: product_id for product_id, item in items.items()}
+            )
+        except LookupError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 404
+        
+        # One query for the stock of every touched product
+        stock = dict(db.session.query(Product.id, Product.stock).filter(Product.id.in_(quantities)).all())
+        error = _stock_error(quantities, stock)
+        if error:
+            db.session.rollback()
+            return error
+        
+        for product_id, quantity in quantities.items():
+            item = items.get(product_id)
+            if quantity <= 0:
+                if item:
+                    db.session.delete(item)
+            elif item:
+                item.quantity = quantity
+            else:
+                db.session.add(CartItem(
+                    user_id=cart_id['user_id'],
+                    session_id=cart_id['session_id'],
+                    product_id=product_id,
+                    quantity=quantity
+                ))
+        db.session.commit()
+        
+        return jsonify(_cart_payload(cart_id, fields))
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Server error: {str(e)}'}), 500
@@ -0,0 +1,126 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy import func, true
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from backend.app import db
+from backend.models.merchant import MerchantProfile
+from backend.models.product import Product, PRODUCT_FIELDS, PRODUCT_PROFILES
+from backend.models.user import User
+from backend.utils.cache import cache, PRODUCT_LISTING_NAMESPACE
+from backend.utils.http_cache import validator, conditional_response
+from backend.utils.projection import resolve_fields, select_columns, serialize
+
+bp = Blueprint('merchants', __name__, url_prefix='/api/merchants')
+
+MAX_PER_PAGE = 100
+
+def load_storefront_summary(merchant_id):
+    """
+    Merchant profile plus product stats in one query: product count, average
+    rating, newest product change and a per-category breakdown (all served by
+    ix_products_merchant_id).
+
+    Returns:
+        dict or None: merchant, stats and validator; None if the user isn't a merchant with a profile
+    """
+    products = Product.__table__
+    stats = (
+        db.session.query(
+            func.count().label('product_count'),
+            func.avg(products.c.rating).label('average_rating'),
+            func.max(products.c.updated_at).label('products_updated_at'),
+        )
+        .filter(products.c.merchant_id == merchant_id)
+        .subquery()
+    )
+    category_counts = (
+        db.session.query(products.c.category, func.count().label('count'))
+        .filter(products.c.merchant_id == merchant_id)
+        .group_by(products.c.category)
+        .subquery()
+    )
+    categories = (
+        db.session.query(func.json_agg(aggregate_order_by(
+            func.json_build_object('value', category_counts.c.category, 'count', category_counts.c.count),
+            category_counts.c.count.desc()
+        )))
+        .select_from(category_counts)
+        .scalar_subquery()
+    )
+
+    row = (
+        db.session.query(MerchantProfile, User.username, User.first_name, User.last_name, stats, categories.label('categories'))
+        .join(User, User.id == MerchantProfile.user_id)
+        .join(stats, true())
+        .filter(MerchantProfile.user_id == merchant_id, User.role == 'merchant')
+        .first()
+    )
+    if row is None:
+        return None
+
+    profile = row.MerchantProfile
+    merchant = profile.to_dict()
+    # Public identity only; the account's email, phone and address stay private
+    merchant['owner'] = {
+        'id': merchant_id,
+        'name': f"{row.first_name or ''} {row.last_name or ''}".strip() or row.username,
+    }
+    last_modified = max(filter(None, [profile.updated_at, row.products_updated_at]), default=None)
+    return {
+        'merchant': merchant,
+        'stats': {
+            'product_count': row.product_count,
+            'average_rating': round(float(row.average_rating), 2) if row.average_rating is not None else 0.0,
+            'categories': row.categories or [],
+        },
+        'validator': validator(merchant, row.product_count, row.products_updated_at, last_modified=last_modified),
+    }
+
+def storefront_products(merchant_id, fields, page, per_page):
+    """A page of the merchant's products (newest first), projected to the requested fields"""
+    rows = (
+        db.session.query(*select_columns(PRODUCT_FIELDS, fields))
+        .filter(Product.merchant_id == merchant_id)
+        .order_by(Product.id.desc())
+        .limit(per_page)
+        .offset((page - 1) * per_page)
+        .all()
+    )
+    return [serialize(row, PRODUCT_FIELDS, fields) for row in rows]
+
+def get_storefront_summary(merchant_id):
+    """Cached storefront summary; dropped with the listings whenever products change"""
+    return cache.get_or_set(PRODUCT_LISTING_NAMESPACE, f'storefront:{merchant_id}',
+                            lambda: load_storefront_summary(merchant_id))
+
+@bp.route('/<int:merchant_id>', methods=['GET'])
+def get_storefront(merchant_id):
+    """Merchant storefront: profile, aggregate stats and a page of products (?page, per_page, fields/profile)"""
+    try:
+        fields = resolve_fields(request.args, PRODUCT_FIELDS, PRODUCT_PROFILES, 'card')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), MAX_PER_PAGE)
+
+    summary = get_storefront_summary(merchant_id)
+    if summary is None:
+        return jsonify({'error': 'Merchant not found'}), 404
+
+    def build():
+        def load():
+            total = summary['stats']['product_count']
+            return {
+                'merchant': summary['merchant'],
+                'stats': summary['stats'],
+                'products': storefront_products(merchant_id, fields, page, per_page),
+                'page': page,
+                'per_page': per_page,
+                'pages': (total + per_page - 1) // per_page,
+                'total': total,
+            }
+        key = cache.make_key('storefront', merchant_id, page, per_page, ','.join(fields))
+        return jsonify(cache.get_or_set(PRODUCT_LISTING_NAMESPACE, key, load))
+
+    current = validator(summary['validator']['etag'], page, per_page, fields,
+                        last_modified=summary['validator']['last_modified'])
+    return conditional_response(current, build, 'merchant')
@@ -1,15 +1,15 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify
+from decimal import Decimal
+from sqlalchemy import update, insert, values, column, Integer
 from backend.app import db
 from backend.models.order import Order, OrderItem
 from backend.models.cart import CartItem
 from backend.models.product import Product
+from backend.utils.cache import invalidate_products
+from backend.utils.identity import get_current_user_id
 
 bp = Blueprint('orders', __name__, url_prefix='/api/orders')
 
-def get_current_user_id():
-    """Helper to get current user ID from session"""
-    return session.get('user_id')
-
 @bp.route('/', methods=['GET'])
 def get_orders():
     """Get all orders for current user"""
@@ -17,8 +17,9 @@ def get_orders():
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-    return jsonify([order.to_dict() for order in orders])
+    # Three queries total (orders, items, products) however many orders there are
+    orders = Order.query.options(Order.items_loader(lean=True)).filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
+    return jsonify([order.to_dict(lean=True) for order in orders])
 
 @bp.route('/<int:order_id>', methods=['GET'])
 def get_order(order_id):
@@ -27,7 +28,7 @@ def get_order(order_id):
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    order = Order.query.get_or_404(order_id)
+    order = Order.query.options(Order.items_loader()).filter_by(id=order_id).first_or_404()
     if order.user_id != user_id:
         return jsonify({'error': 'Unauthorized'}), 403
     
@@ -61,21 +62,33 @@ def create_order():
     if not cart_items:
         return jsonify({'error': 'Cart is empty'}), 400
     
+    quantities = {}
+    for cart_item in cart_items:
+        quantities[cart_item.product_id] = quantities.get(cart_item.product_id, 0) + cart_item.quantity
+    
+    # Lock every cart product in one SELECT ... FOR UPDATE. Locking in id order
+    # means concurrent checkouts queue up instead of deadlocking or overselling.
+    products = Product.query.filter(Product.id.in_(quantities)).order_by(Product.id).with_for_update().all()
+    products_by_id = {product.id: product for product in products}
+    
     # Calculate total
-    total_amount = 0
+    total_amount = Decimal('0')
     order_items_data = []
     
-    for cart_item in cart_items:
-        product = Product.query.get(cart_item.product_id)
-        if not product or product.stock < cart_item.quantity:
+    for product_id, quantity in sorted(quantities.items()):
+        product = products_by_id.get(product_id)
+        if not product:
+            db.session.rollback()
+            return jsonify({'error': 'A product in your cart is no longer available'}), 400
+        if (product.stock or 0) < quantity:
+            db.session.rollback()
             return jsonify({'error': f'Insufficient stock for {product.name}'}), 400
         
-        item_total = float(product.price) * cart_item.quantity
-        total_amount += item_total
+        total_amount += product.price * quantity
         
         order_items_data.append({
             'product_id': product.id,
-            'quantity': cart_item.quantity,
+            'quantity': quantity,
             'price': product.price
         })
     
@@ -90,24 +103,37 @@ def create_order():
     db.session.add(order)
     db.session.flush()
     
-    # Create order items and update stock
-    for item_data in order_items_data:
-        order_item = OrderItem(
-            order_id=order.id,
-            product_id=item_data['product_id'],
-            quantity=item_data['quantity'],
-            price=item_data['price']
-        )
-        db.session.add(order_item)
-        
-        # Update product stock
-        product = Product.query.get(item_data['product_id'])
-        product.stock -= item_data['quantity']
+    # Decrement all stock in a single UPDATE ... FROM (VALUES ...); the stock
+    # guard makes it impossible to go negative even without the row locks
+    products_table = Product.__table__
+    decrements = values(
+        column('product_id', Integer), column('quantity', Integer), name='decrements'
+    ).data([(item['product_id'], item['quantity']) for item in order_items_data])
+    updated_ids = db.session.execute(
+        update(products_table)
+        .where(products_table.c.id == decrements.c.product_id)
+        .where(products_table.c.stock >= decrements.c.quantity)
+        .values(stock=products_table.c.stock - decrements.c.quantity)
+        .returning(products_table.c.id)
+    ).scalars().all()
+    
+    if len(updated_ids) != len(order_items_data):
+        db.session.rollback()
+        return jsonify({'error': 'Insufficient stock for one or more items'}), 400
+    
+    # Bulk insert order items
+    db.session.execute(
+        insert(OrderItem),
+        [dict(item, order_id=order.id) for item in order_items_data]
+    )
     
     # Clear cart
     CartItem.query.filter_by(user_id=user_id).delete()
     
     db.session.commit()
     
+    # Stock changed, so cached product payloads and listings are stale
+    invalidate_products([item['product_id'] for item in order_items_data])
+    
+    order = Order.query.options(Order.items_loader()).filter_by(id=order.id).one()
     return jsonify(order.to_dict()), 201
-
@@ -1,50 +1,255 @@
 from flask import Blueprint, request, jsonify, render_template
+from decimal import Decimal
+from sqlalchemy import func
 from backend.app import db
-from backend.models.product import Product
+from backend.models.product import Product, PRODUCT_FIELDS, PRODUCT_PROFILES
+from backend.models.facet import ProductFacet, PRICE_BUCKETS
+from backend.utils.search import apply_search
+from backend.utils.projection import resolve_fields, select_columns, serialize
+from backend.utils.cache import cache, invalidate_products, PRODUCT_NAMESPACE, PRODUCT_LISTING_NAMESPACE
+from backend.utils.http_cache import validator, conditional_response
+from backend.utils.pagination import (
+    encode_cursor, decode_cursor, keyset_page, approximate_table_count, estimate_query_count
+)
 
 bp = Blueprint('products', __name__, url_prefix='/api/products')
 
-@bp.route('/', methods=['GET'])
-def get_products():
-    """Get all products with optional filtering"""
-    try:
-        category = request.args.get('category')
-        search = request.args.get('search')
-        local = request.args.get('local', '').lower() == 'true'
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        query = Product.query
-        
-        if category:
-            query = query.filter(Product.category == category)
-        if search:
-            query = query.filter(Product.name.ilike(f'%{search}%'))
-        if local:
-            # Filter for local products (even product IDs)
-            query = query.filter(Product.id % 2 == 0)
+# Sort orders usable with keyset pagination:
+# name -> (sort expression, descending, cursor value of a row, cursor value parser, columns the cursor reads)
+PRODUCT_SORTS = {
+    'id': (Product.id, False, lambda p: p.id, int, ()),
+    'newest': (Product.id, True, lambda p: p.id, int, ()),
+    'price_asc': (Product.price, False, lambda p: str(p.price), Decimal, (Product.price,)),
+    'price_desc': (Product.price, True, lambda p: str(p.price), Decimal, (Product.price,)),
+    'rating': (func.coalesce(Product.rating, 0), True, lambda p: str(p.rating or 0), Decimal, (Product.rating,)),
+}
+
+def list_products(args):
+    """
+    Build the product listing payload for the given query args; see _build_listing.
+    
+    Raises:
+        ValueError: On an unknown sort, total mode, field, profile or a malformed cursor
+    """
+    return _build_listing(args)[0]
+
+def listing_entry(args):
+    """
+    Listing payload plus its HTTP validator, cached together.
+    
+    The validator hashes the page's (id, updated_at) pairs with the args and
+    the totals, so it comes from rows the listing loads anyway instead of an
+    aggregate over the whole filtered set.
+    """
+    payload, rows = _build_listing(args)
+    versions = [(row.id, row.updated_at) for row in rows]
+    last_modified = max((updated_at for _, updated_at in versions if updated_at), default=None)
+    current = validator(
+        cache.make_key('list', args=args), versions,
+        payload.get('total'), payload.get('pages'), payload.get('next_cursor'),
+        last_modified=last_modified
+    )
+    return {'payload': payload, 'validator': current}
+
+def _build_listing(args):
+    """
+    Build the product listing payload for the given query args.
+    
+    Page mode (default) uses page/per_page with an exact total. Passing
+    cursor= (empty for the first page) switches to keyset pagination:
+    no OFFSET, an opaque next_cursor, and total only when asked for via
+    total=exact or total=approx.
+    
+    fields= or profile= (card, summary, detail; default detail) choose the
+    product fields. Only their columns are selected, and rows are serialized
+    without building Product objects.
+    
+    A search runs full-text first and only falls back to trigram similarity
+    (a second query) when the full-text search matches nothing.
+    
+    Returns:
+        tuple: (payload, page rows); rows carry id and updated_at for the validator
+    
+    Raises:
+        ValueError: On an unknown sort, total mode, field, profile or a malformed cursor
+    """
+    sort = args.get('sort')
+    cursor = args.get('cursor')
+    
+    if sort and sort not in PRODUCT_SORTS:
+        raise ValueError(f"Unknown sort '{sort}'. Use one of: {', '.join(PRODUCT_SORTS)}")
+    
+    fields = resolve_fields(args, PRODUCT_FIELDS, PRODUCT_PROFILES, 'detail')
+    position = decode_cursor(cursor) if cursor else None
+    # Later pages of a fuzzy search carry the mode in their cursor
+    fuzzy = bool(position and position.get('m') == 'fuzzy')
+    
+    result, products = _listing_page(args, fields, sort, position, fuzzy)
+    if result.get('search_mode') == 'fulltext' and not products:
+        # Page mode knows the exact total; a keyset listing only knows on its first page
+        no_matches = result['total'] == 0 if cursor is None else position is None
+        if no_matches:
+            result, products = _listing_page(args, fields, sort, position, fuzzy=True)
+    return result, products
+
+def _listing_page(args, fields, sort, position, fuzzy):
+    """One listing page for _build_listing, searching by full-text or (fuzzy) trigram similarity"""
+    page = args.get('page', 1, type=int)
+    per_page = args.get('per_page', 20, type=int)
+    cursor = args.get('cursor')
+    
+    # Keyset cursors are built from the last row, so select the sort key too;
+    # updated_at versions the page for its validator
+    sort_columns = PRODUCT_SORTS[sort or 'id'][4] if cursor is not None else ()
+    query, search_mode = _filter_products(
+        db.session.query(*select_columns(PRODUCT_FIELDS, fields, extra=tuple(sort_columns) + (Product.updated_at,))),
+        args, fuzzy=fuzzy
+    )
+    
+    if cursor is not None:
+        filtered = any(args.get(name) for name in ('category', 'local', 'price', 'search'))
+        result, products = _keyset_listing(query, position, sort or 'id', per_page, args.get('total', 'none'),
+                                           filtered=filtered, fields=fields, search_mode=search_mode)
+    else:
+        if sort:
+            sort_expression, descending = PRODUCT_SORTS[sort][:2]
+            order = (sort_expression.desc(), Product.id.desc()) if descending else (sort_expression, Product.id)
+            query = query.order_by(None).order_by(*order)
         
         pagination = query.paginate(page=page, per_page=per_page, error_out=False)
         products = pagination.items
         
-        return jsonify({
-            'products': [product.to_dict() for product in products],
+        result = {
+            'products': [serialize(product, PRODUCT_FIELDS, fields) for product in products],
             'total': pagination.total,
             'page': page,
             'per_page': per_page,
             'pages': pagination.pages
-        })
+        }
+    
+    if search_mode:
+        result['search_mode'] = search_mode
+    return result, products
+
+def _filter_products(query, args, fuzzy=False):
+    """
+    Apply the listing filters (category, local, price, search) to a Product query.
+    fuzzy=True searches by trigram similarity instead of full-text (see apply_search).
+    
+    Returns:
+        tuple: (query, search_mode)
+    """
+    category = args.get('category')
+    search = args.get('search')
+    local = args.get('local', '').lower() == 'true'
+    price = args.get('price')
+    
+    if category:
+        query = query.filter(Product.category == category)
+    if local:
+        # Filter for local products (even product IDs)
+        query = query.filter(Product.id % 2 == 0)
+    if price:
+        bucket = next((b for b in PRICE_BUCKETS if b[0] == price), None)
+        if not bucket:
+            raise ValueError(f"Unknown price bucket '{price}'")
+        _, low, high = bucket
+        query = query.filter(Product.price >= low)
+        if high is not None:
+            query = query.filter(Product.price < high)
+    
+    search_mode = None
+    if search:
+        # Ranked full-text search, or trigram similarity for typos
+        query, search_mode = apply_search(query, search, fuzzy=fuzzy)
+    return query, search_mode
+
+def _keyset_listing(query, position, sort, per_page, total_mode, filtered, fields, search_mode=None):
+    """Keyset-paginated listing after a decoded cursor position (None: first page); see list_products. Returns (payload, page rows)"""
+    if total_mode not in ('none', 'exact', 'approx'):
+        raise ValueError("total must be one of: none, exact, approx")
+    
+    sort_expression, descending, cursor_value, parse_value = PRODUCT_SORTS[sort][:4]
+    
+    after = None
+    if position:
+        if position.get('s') != sort:
+            raise ValueError('Cursor does not match the requested sort')
+        try:
+            after = (parse_value(position['v']), position['id'])
+        except (KeyError, TypeError, ArithmeticError, ValueError):
+            raise ValueError('Invalid cursor: bad sort value')
+    
+    # Count against the filters only, before the keyset bound is applied
+    total = None
+    if total_mode == 'exact':
+        total = query.order_by(None).count()
+    elif total_mode == 'approx':
+        total = estimate_query_count(query) if filtered else approximate_table_count(Product.__tablename__)
+    
+    products, has_more = keyset_page(query, sort_expression, Product.id, descending, after, per_page)
+    
+    next_cursor = None
+    if has_more and products:
+        last = products[-1]
+        next_cursor = encode_cursor(sort, cursor_value(last), last.id,
+                                    search_mode='fuzzy' if search_mode == 'fuzzy' else None)
+    
+    return {
+        'products': [serialize(product, PRODUCT_FIELDS, fields) for product in products],
+        'per_page': per_page,
+        'sort': sort,
+        'next_cursor': next_cursor,
+        'total': total,
+        'total_is_estimate': total_mode == 'approx'
+    }, products
+
+@bp.route('/', methods=['GET'])
+def get_products():
+    """Get all products with optional filtering"""
+    try:
+        entry = cache.get_or_set(PRODUCT_LISTING_NAMESPACE, cache.make_key('entry', args=request.args),
+                                 lambda: listing_entry(request.args))
+        return conditional_response(entry['validator'], lambda: jsonify(entry['payload']), 'listing')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
         return jsonify({'error': str(e), 'products': [], 'total': 0, 'page': 1, 'per_page': 20, 'pages': 0}), 500
 
+def _load_product(product_id):
+    # Cache every field once per product; ?fields= projections are cut from it
+    product = Product.query.get(product_id)
+    return product.to_dict(tuple(PRODUCT_FIELDS)) if product else None
+
+def get_product_payload(product_id, fields):
+    """Cached product payload cut down to the given fields, or None if it doesn't exist"""
+    payload = cache.get_or_set(PRODUCT_NAMESPACE, product_id, lambda: _load_product(product_id))
+    if payload is None:
+        return None
+    return {name: payload[name] for name in fields}
+
 @bp.route('/<int:product_id>', methods=['GET'])
 def get_product(product_id):
-    """Get a single product by ID"""
+    """Get a single product by ID (?fields= / ?profile= select the fields)"""
     try:
-        product = Product.query.get_or_404(product_id)
-        return jsonify(product.to_dict())
+        fields = resolve_fields(request.args, PRODUCT_FIELDS, PRODUCT_PROFILES, 'detail')
+        # Primary-key lookup of updated_at; a matching client copy skips the payload entirely
+        row = db.session.query(Product.updated_at).filter(Product.id == product_id).first()
+        if row is None:
+            return jsonify({'error': 'Not found'}), 404
+        
+        def build():
+            payload = get_product_payload(product_id, fields)
+            if payload is None:
+                return jsonify({'error': 'Not found'}), 404
+            return jsonify(payload)
+        
+        current = validator(product_id, row.updated_at, fields, last_modified=row.updated_at)
+        return conditional_response(current, build, 'product')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         import traceback
         traceback.print_exc()
@@ -68,14 +273,56 @@ def create_product():
     
     db.session.add(product)
     db.session.commit()
+    invalidate_products([product.id])
     
     return jsonify(product.to_dict()), 201
 
+def facets_validator(name):
+    """HTTP validator for payloads built from the facet table"""
+    last_modified, count = db.session.query(func.max(ProductFacet.updated_at), func.count()).select_from(ProductFacet).one()
+    return validator(name, count, last_modified, last_modified=last_modified)
+
+def load_categories():
+    # Served from the maintained facet table instead of SELECT DISTINCT over products
+    facets = ProductFacet.query.filter(
+        ProductFacet.facet == 'category',
+        ProductFacet.product_count > 0
+    ).order_by(ProductFacet.value).all()
+    return [facet.value for facet in facets]
+
+def category_names():
+    """Cached list of categories that have products"""
+    return cache.get_or_set(PRODUCT_LISTING_NAMESPACE, 'categories', load_categories)
+
 @bp.route('/categories', methods=['GET'])
 def get_categories():
     """Get all unique product categories"""
-    categories = db.session.query(Product.category).distinct().all()
-    return jsonify([cat[0] for cat in categories if cat[0]])
+    return conditional_response(
+        cache.get_or_set(PRODUCT_LISTING_NAMESPACE, 'validator:categories', lambda: facets_validator('categories')),
+        lambda: jsonify(category_names()),
+        'catalog_meta'
+    )
+
+@bp.route('/facets', methods=['GET'])
+def get_facets():
+    """Get product counts per category, local flag and price bucket for the filter sidebar"""
+    def load_facets():
+        result = {'category': [], 'local': [], 'price': []}
+        facets = ProductFacet.query.filter(ProductFacet.product_count > 0).all()
+        for facet in facets:
+            if facet.facet in result:
+                result[facet.facet].append(facet.to_dict())
+        
+        result['category'].sort(key=lambda item: item['value'])
+        bucket_order = [label for label, _, _ in PRICE_BUCKETS]
+        result['price'].sort(key=lambda item: bucket_order.index(item['value']) if item['value'] in bucket_order else len(bucket_order))
+        return result
+    
+    return conditional_response(
+        cache.get_or_set(PRODUCT_LISTING_NAMESPACE, 'validator:facets', lambda: facets_validator('facets')),
+        lambda: jsonify(cache.get_or_set(PRODUCT_LISTING_NAMESPACE, 'facets', load_facets)),
+        'catalog_meta'
+    )
 
 @bp.route('/populate-aliexpress', methods=['POST'])
 def populate_aliexpress():
@@ -1,8 +1,11 @@
-from flask import Blueprint, request, jsonify, session
+from flask import Blueprint, request, jsonify
 from backend.app import db
 from backend.models.user import User
 from backend.models.address import Address
 from backend.models.payment_method import PaymentMethod
+from backend.utils.identity import get_current_user as load_current_user, get_current_user_id, login_user, logout_user
+from backend.utils.image_pipeline import HAS_PILLOW, ingest_image
+from backend.utils.http_cache import validator, conditional_response
 from datetime import datetime
 
 bp = Blueprint('users', __name__, url_prefix='/api/users')
@@ -82,8 +85,11 @@ def register():
     db.session.add(user)
     db.session.commit()
     
-    # Automatically log the user in after registration
-    session['user_id'] = user.id
+    # Automatically log the user in after registration, keeping the cart built as a guest
+    from backend.api.cart import claim_guest_cart
+    claim_guest_cart(user.id)
+    login_user(user)
+    db.session.commit()
     
     return jsonify({
         'message': 'Registration successful',
@@ -123,30 +129,10 @@ def login():
     
     if user and user.check_password(password):
         # Merge guest cart with user cart before setting user_id
-        guest_session_id = session.get('session_id')
-        if guest_session_id:
-            from backend.models.cart import CartItem
-            # Get guest cart items
-            guest_cart_items = CartItem.query.filter_by(session_id=guest_session_id).all()
-            
-            for guest_item in guest_cart_items:
-                # Check if user already has this product in cart
-                user_cart_item = CartItem.query.filter_by(
-                    user_id=user.id,
-                    product_id=guest_item.product_id
-                ).first()
-                
-                if user_cart_item:
-                    # Merge quantities
-                    user_cart_item.quantity += guest_item.quantity
-                    # Remove guest item
-                    db.session.delete(guest_item)
-                else:
-                    # Transfer guest item to user
-                    guest_item.user_id = user.id
-                    guest_item.session_id = None
+        from backend.api.cart import claim_guest_cart
+        claim_guest_cart(user.id)
         
-        session['user_id'] = user.id
+        login_user(user)
         db.session.commit()
         
         return jsonify({
@@ -159,17 +145,16 @@ def login():
 @bp.route('/logout', methods=['POST'])
 def logout():
     """Logout user"""
-    session.pop('user_id', None)
+    logout_user()
     return jsonify({'message': 'Logout successful'}), 200
 
 @bp.route('/me', methods=['GET'])
 def get_current_user():
     """Get current logged in user"""
-    user_id = session.get('user_id')
-    if not user_id:
+    user = load_current_user()
+    if not user:
         return jsonify({'error': 'Not authenticated'}), 401
     
-    user = User.query.get_or_404(user_id)
     return jsonify(user.to_dict())
 
 @bp.route('/<int:user_id>', methods=['GET'])
@@ -182,7 +167,7 @@ def get_user(user_id):
 @bp.route('/addresses', methods=['GET'])
 def get_addresses():
     """Get all addresses for the current user"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -192,7 +177,7 @@ def get_addresses():
 @bp.route('/addresses', methods=['POST'])
 def create_address():
     """Create a new address for the current user"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -239,7 +224,7 @@ def create_address():
 @bp.route('/addresses/<int:address_id>', methods=['GET'])
 def get_address(address_id):
     """Get a specific address"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -249,7 +234,7 @@ def get_address(address_id):
 @bp.route('/addresses/<int:address_id>', methods=['PUT'])
 def update_address(address_id):
     """Update an address"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -287,7 +272,7 @@ def update_address(address_id):
 @bp.route('/addresses/<int:address_id>', methods=['DELETE'])
 def delete_address(address_id):
     """Delete an address"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -300,7 +285,7 @@ def delete_address(address_id):
 @bp.route('/addresses/<int:address_id>/set-default', methods=['POST'])
 def set_default_address(address_id):
     """Set an address as default"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -319,7 +304,7 @@ def set_default_address(address_id):
 @bp.route('/payment-methods', methods=['GET'])
 def get_payment_methods():
     """Get all payment methods for the current user"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -329,7 +314,7 @@ def get_payment_methods():
 @bp.route('/payment-methods', methods=['POST'])
 def create_payment_method():
     """Create a new payment method for the current user"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -371,7 +356,7 @@ def create_payment_method():
 @bp.route('/payment-methods/<int:payment_method_id>', methods=['GET'])
 def get_payment_method(payment_method_id):
     """Get a specific payment method"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -381,7 +366,7 @@ def get_payment_method(payment_method_id):
 @bp.route('/payment-methods/<int:payment_method_id>', methods=['PUT'])
 def update_payment_method(payment_method_id):
     """Update a payment method"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -410,7 +395,7 @@ def update_payment_method(payment_method_id):
 @bp.route('/payment-methods/<int:payment_method_id>', methods=['DELETE'])
 def delete_payment_method(payment_method_id):
     """Delete a payment method"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -423,7 +408,7 @@ def delete_payment_method(payment_method_id):
 @bp.route('/payment-methods/<int:payment_method_id>/set-default', methods=['POST'])
 def set_default_payment_method(payment_method_id):
     """Set a payment method as default"""
-    user_id = session.get('user_id')
+    user_id = get_current_user_id()
     if not user_id:
         return jsonify({'error': 'Not authenticated'}), 401
     
@@ -441,27 +426,22 @@ def set_default_payment_method(payment_method_id):
 # Merchant endpoints
 @bp.route('/merchants/<int:merchant_id>', methods=['GET'])
 def get_merchant(merchant_id):
-    """Get merchant profile by user ID"""
-    from backend.models.merchant import MerchantProfile
-    from backend.models.product import Product
-    
-    user = User.query.get_or_404(merchant_id)
-    if user.role != 'merchant':
-        return jsonify({'error': 'User is not a merchant'}), 404
-    
-    merchant_profile = MerchantProfile.query.filter_by(user_id=merchant_id).first()
-    if not merchant_profile:
-        return jsonify({'error': 'Merchant profile not found'}), 404
-    
-    # Get merchant's products
-    products = Product.query.filter_by(merchant_id=merchant_id).limit(20).all()
-    
-    result = merchant_profile.to_dict()
-    result['user'] = user.to_dict()
-    result['products'] = [product.to_dict() for product in products]
-    result['product_count'] = Product.query.filter_by(merchant_id=merchant_id).count()
-    
-    return jsonify(result)
+    """Get merchant profile by user ID (see /api/merchants/<id> for the paginated storefront)"""
+    from backend.api.merchants import get_storefront_summary, storefront_products
+    from backend.models.product import PRODUCT_PROFILES
+    
+    summary = get_storefront_summary(merchant_id)
+    if summary is None:
+        return jsonify({'error': 'Merchant not found'}), 404
+    
+    def build():
+        result = dict(summary['merchant'])
+        result['user'] = result.pop('owner')
+        result['products'] = storefront_products(merchant_id, PRODUCT_PROFILES['detail'], 1, 20)
+        result['product_count'] = summary['stats']['product_count']
+        return jsonify(result)
+    
+    return conditional_response(summary['validator'], build, 'merchant')
 
 @bp.route('/merchants/onboard', methods=['POST'])
 def onboard_merchant():
@@ -471,13 +451,10 @@ def onboard_merchant():
     from werkzeug.utils import secure_filename
     from datetime import datetime
     
-    user_id = session.get('user_id')
-    if not user_id:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
-    user = User.query.get(user_id)
+    user = load_current_user()
     if not user:
-        return jsonify({'error': 'User not found'}), 404
+        return jsonify({'error': 'Not authenticated'}), 401
+    user_id = user.id
     
     # Check if user already has a merchant profile
     existing_profile = MerchantProfile.query.filter_by(user_id=user_id).first()
@@ -533,6 +510,13 @@ def onboard_merchant():
             is_verified=False  # Will be verified by admin
         )
         
+        # Thumbnail the logo now (local file, quick); left to `flask process-images` if it fails
+        if logo_url and HAS_PILLOW:
+            try:
+                merchant_profile.logo_hash = ingest_image(logo_url)
+            except Exception as e:
+                print(f"⚠️  Could not process merchant logo: {e}")
+        
         db.session.add(merchant_profile)
         
         # Update user role to merchant
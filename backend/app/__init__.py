@@ -1,6 +1,8 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
+import click
+import hmac
 import os
 from dotenv import load_dotenv
 
@@ -43,6 +45,25 @@ def create_app():
     if database_url.startswith("postgresql://") and "psycopg" not in database_url:
         database_url = database_url.replace("postgresql://", "postgresql+psycopg://", 1)
 
+    # Connection pooling: DB_POOL_MODE=queue (sized pool for long-lived servers), null (no
+    # client-side pool, behind PgBouncer / Neon's -pooler endpoint) or auto (null on Vercel
+    # or for a pooler URL, queue otherwise)
+    from backend.app import pooling
+
+    app.config["DB_POOL_MODE"] = pooling.resolve_mode(
+        os.getenv("DB_POOL_MODE", "auto"), database_url, serverless=bool(os.getenv("VERCEL"))
+    )
+    app.config["DB_POOL_SIZE"] = int(os.getenv("DB_POOL_SIZE", 5))
+    app.config["DB_MAX_OVERFLOW"] = int(os.getenv("DB_MAX_OVERFLOW", 5))
+    app.config["DB_POOL_TIMEOUT"] = int(os.getenv("DB_POOL_TIMEOUT", 5))
+    app.config["DB_POOL_RECYCLE"] = int(os.getenv("DB_POOL_RECYCLE", 300))
+    app.config["DB_CONNECT_TIMEOUT"] = int(os.getenv("DB_CONNECT_TIMEOUT", 10))
+    # Connections to open at startup (queue mode; null mode just wakes the database)
+    app.config["DB_POOL_WARMUP"] = int(os.getenv("DB_POOL_WARMUP", 0))
+    # Bearer token for GET /api/metrics/pool; the route is disabled without one
+    app.config["METRICS_TOKEN"] = os.getenv("METRICS_TOKEN")
+    database_url = pooling.strip_pooler_params(database_url)
+
     app.config["SQLALCHEMY_DATABASE_URI"] = database_url
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
@@ -58,30 +79,79 @@ def create_app():
         ]
     )
 
-    # Configure engine options based on database type
-    engine_options = {
-        "pool_pre_ping": True,  # Verify connections before using
-        "pool_recycle": 300,  # Recycle connections after 5 minutes
+    # Only require SSL for remote databases (Neon, Supabase, etc.)
+    connect_args = {
+        "connect_timeout": app.config["DB_CONNECT_TIMEOUT"],
+        "sslmode": "require" if is_remote_db else "disable",
     }
 
-    # Only require SSL for remote databases (Neon, Supabase, etc.)
-    if is_remote_db:
-        engine_options["connect_args"] = {"connect_timeout": 10, "sslmode": "require"}
-    else:
-        # Local database - no SSL required
-        engine_options["connect_args"] = {"connect_timeout": 10, "sslmode": "disable"}
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = pooling.engine_options(app.config, connect_args)
+
+    # Read-through cache for catalog responses (memory, redis or none)
+    app.config["CACHE_BACKEND"] = os.getenv("CACHE_BACKEND", "memory")
+    app.config["CACHE_REDIS_URL"] = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+    app.config["CACHE_DEFAULT_TTL"] = int(os.getenv("CACHE_DEFAULT_TTL", 300))
+    app.config["CACHE_MAX_ENTRIES"] = int(os.getenv("CACHE_MAX_ENTRIES", 1024))
+
+    # JSON encoding for API responses: orjson when installed ('auto'), or force 'orjson' / 'stdlib'
+    from backend.utils.json_provider import provider_class
+
+    app.config["JSON_PROVIDER"] = os.getenv("JSON_PROVIDER", "auto")
+    app.json = provider_class(app.config["JSON_PROVIDER"])(app)
+
+    # gzip/brotli for dynamic text responses at least COMPRESS_MIN_SIZE bytes long
+    app.config["COMPRESS_ENABLED"] = os.getenv("COMPRESS_ENABLED", "true").lower() == "true"
+    app.config["COMPRESS_MIN_SIZE"] = int(os.getenv("COMPRESS_MIN_SIZE", 1024))
+    app.config["COMPRESS_GZIP_LEVEL"] = int(os.getenv("COMPRESS_GZIP_LEVEL", 6))
+    app.config["COMPRESS_BROTLI_QUALITY"] = int(os.getenv("COMPRESS_BROTLI_QUALITY", 4))
 
-    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options
+    # Guest cart storage: 'database' (cart_items rows) or 'session' (signed cookie, moved
+    # to cart_items on login or once it holds more than GUEST_CART_MAX_ITEMS products)
+    app.config["GUEST_CART_STORAGE"] = os.getenv("GUEST_CART_STORAGE", "database")
+    app.config["GUEST_CART_MAX_ITEMS"] = int(os.getenv("GUEST_CART_MAX_ITEMS", 50))
+
+    # Guest carts untouched for this many days are deleted by `flask reap-guest-carts`
+    app.config["GUEST_CART_TTL_DAYS"] = int(os.getenv("GUEST_CART_TTL_DAYS", 30))
 
     # Initialize extensions
     db.init_app(app)
     CORS(app)
 
+    with app.app_context():
+        pooling.install_metrics(db.engine)
+        warmup = app.config["DB_POOL_WARMUP"]
+        if warmup > 0:
+            if app.config["DB_POOL_MODE"] == "null":
+                warmup = 1
+            else:
+                warmup = min(warmup, app.config["DB_POOL_SIZE"])
+            try:
+                pooling.warm_pool(db.engine, warmup)
+            except Exception as e:
+                print(f"⚠️  Connection pool warmup failed: {e}")
+
+    from backend.utils.cache import cache
+
+    cache.init_app(app)
+
+    # Catalog routes set their own Cache-Control; everything else under /api/ stays private
+    from backend.utils.http_cache import apply_default_policy
+
+    app.after_request(apply_default_policy)
+
+    # Content-hashed static URLs, precompressed static variants and response compression
+    from backend.utils.assets import asset_url, compress_response, serve_static
+
+    app.jinja_env.globals["asset_url"] = asset_url
+    app.view_functions["static"] = serve_static
+    app.after_request(compress_response)
+
     # Register blueprints
-    from backend.api import products, users, orders, cart, test_db
+    from backend.api import products, users, merchants, orders, cart, test_db
 
     app.register_blueprint(products.bp)
     app.register_blueprint(users.bp)
+    app.register_blueprint(merchants.bp)
     app.register_blueprint(orders.bp)
     app.register_blueprint(cart.bp)
     app.register_blueprint(test_db.bp)
@@ -89,17 +159,56 @@ def create_app():
     # Register frontend routes
     from flask import render_template, jsonify
 
+    # Catalog pages render their first screen of products server-side (SSR_ENABLED=false
+    # serves the empty shells that load everything from the API instead)
+    from flask import request
+    from backend.utils.http_cache import conditional_response
+    from backend.utils.ssr import initial_listing, render_product_card
+
+    app.config["SSR_ENABLED"] = os.getenv("SSR_ENABLED", "true").lower() == "true"
+    app.jinja_env.globals["render_product_card"] = render_product_card
+
+    def server_rendered(load):
+        # A failed preload must never break the page; the script fetches the data instead
+        if not app.config["SSR_ENABLED"]:
+            return None
+        try:
+            return load()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  Server-side render skipped: {e}")
+            return None
+
     @app.route("/")
     def index():
-        return render_template("index.html")
+        from backend.api.products import category_names
+
+        featured = server_rendered(lambda: initial_listing({}, per_page=8))
+        categories = server_rendered(category_names)
+        return conditional_response(
+            None,
+            lambda: render_template("index.html", featured=featured, categories=categories),
+            "listing",
+        )
 
     @app.route("/products")
     def products_page():
-        return render_template("products.html")
+        listing = server_rendered(lambda: initial_listing(request.args, per_page=12))
+        return conditional_response(
+            None, lambda: render_template("products.html", listing=listing), "listing"
+        )
 
     @app.route("/product/<int:product_id>")
     def product_detail(product_id):
-        return render_template("product_detail.html", product_id=product_id)
+        from backend.api.products import get_product_payload
+        from backend.models.product import PRODUCT_PROFILES
+
+        product = server_rendered(lambda: get_product_payload(product_id, PRODUCT_PROFILES["detail"]))
+        return conditional_response(
+            None,
+            lambda: render_template("product_detail.html", product_id=product_id, product=product),
+            "product",
+        )
 
     @app.route("/cart")
     def cart_page():
@@ -153,92 +262,36 @@ def create_app():
     def added_to_cart_page():
         return render_template("added_to_cart.html")
 
-    # Create tables (only if database is available, skip in serverless if connection fails)
-    # In serverless, we'll initialize lazily to avoid startup crashes
+    # The schema is managed by versioned migrations (backend/migrations, `flask db upgrade`).
+    # Startup only compares the database's schema version with the newest migration;
+    # with AUTO_MIGRATE (default outside serverless) pending migrations are applied in place.
+    # In serverless, we check lazily to avoid startup crashes
+    app.config["AUTO_MIGRATE"] = (
+        os.getenv("AUTO_MIGRATE", "false" if os.getenv("VERCEL") else "true").lower() == "true"
+    )
     app.db_initialized = False
 
     def init_db():
-        """Initialize database tables - called lazily when needed"""
+        """Check the database schema version - called lazily when needed"""
         if app.db_initialized:
             return
 
+        from backend import migrations
+
         try:
             with app.app_context():
-                # Try to connect to database first
-                db.engine.connect()
-                db.create_all()
-
-                # Add new columns/tables for merchant system if they don't exist
-                try:
-                    from sqlalchemy import inspect, text
-
-                    inspector = inspect(db.engine)
-
-                    # Add role column to users table if it doesn't exist
-                    try:
-                        user_columns = [
-                            col["name"] for col in inspector.get_columns("users")
-                        ]
-                        if "role" not in user_columns:
-                            with db.engine.connect() as conn:
-                                conn.execute(
-                                    text(
-                                        "ALTER TABLE users ADD COLUMN role VARCHAR(20) DEFAULT 'shopper'"
-                                    )
-                                )
-                                conn.commit()
-                            print("✓ Added role column to users table")
-                    except Exception as e:
-                        print(
-                            f"Note: Could not add role column (may already exist): {e}"
-                        )
+                version = migrations.current_version(db.engine)
+                latest = migrations.latest_version()
 
-                    # Add default_category column to users table if it doesn't exist
-                    try:
-                        user_columns = [
-                            col["name"] for col in inspector.get_columns("users")
-                        ]
-                        if "default_category" not in user_columns:
-                            with db.engine.connect() as conn:
-                                conn.execute(
-                                    text(
-                                        "ALTER TABLE users ADD COLUMN default_category VARCHAR(100)"
-                                    )
-                                )
-                                conn.commit()
-                            print("✓ Added default_category column to users table")
-                    except Exception as e:
+                if version < latest:
+                    if app.config["AUTO_MIGRATE"]:
+                        migrations.upgrade(db.engine)
+                    else:
                         print(
-                            f"Note: Could not add default_category column (may already exist): {e}"
+                            f"⚠️  Database schema is at version {version}, latest is {latest}. "
+                            "Run `flask db upgrade`."
                         )
 
-                    # Add merchant_id column to products table if it doesn't exist
-                    try:
-                        product_columns = [
-                            col["name"] for col in inspector.get_columns("products")
-                        ]
-                        if "merchant_id" not in product_columns:
-                            with db.engine.connect() as conn:
-                                conn.execute(
-                                    text(
-                                        "ALTER TABLE products ADD COLUMN merchant_id INTEGER REFERENCES users(id)"
-                                    )
-                                )
-                                conn.commit()
-                            print("✓ Added merchant_id column to products table")
-                    except Exception as e:
-                        print(
-                            f"Note: Could not add merchant_id column (may already exist): {e}"
-                        )
-
-                    # Create merchant_profiles table if it doesn't exist
-                    if "merchant_profiles" not in inspector.get_table_names():
-                        db.create_all()
-                        print("✓ Created merchant_profiles table")
-                except Exception as e:
-                    # Tables might already exist
-                    print(f"Note: Schema migration check completed: {e}")
-
                 app.db_initialized = True
         except Exception as e:
             # Database connection failed - this is OK in serverless if DB isn't configured yet
@@ -261,6 +314,139 @@ def create_app():
             if not app.db_initialized:
                 init_db()
 
+    from flask.cli import AppGroup
+
+    db_cli = AppGroup("db", help="Database schema migrations")
+
+    @db_cli.command("upgrade")
+    @click.option("--to", "target", type=int, default=None, help="Stop at this version")
+    def db_upgrade_command(target):
+        """Apply pending migrations"""
+        from backend import migrations
+
+        applied = migrations.upgrade(db.engine, target)
+        print(f"✅ Applied {len(applied)} migrations, schema is at version {migrations.current_version(db.engine)}")
+
+    @db_cli.command("current")
+    def db_current_command():
+        """Show the database's schema version and any pending migrations"""
+        from backend import migrations
+
+        print(f"Schema version: {migrations.current_version(db.engine)}")
+        for migration in migrations.pending(db.engine):
+            print(f"  pending {migration.version:04d} {migration.name}: {migration.description}")
+
+    @db_cli.command("history")
+    def db_history_command():
+        """List applied migrations"""
+        from backend import migrations
+
+        for version, name, applied_at in migrations.history(db.engine):
+            print(f"{version:04d} {name} (applied {applied_at:%Y-%m-%d %H:%M})")
+
+    app.cli.add_command(db_cli)
+
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_command():
+        """Create model indexes missing from the database (CREATE INDEX CONCURRENTLY)"""
+        from backend.app.schema import ensure_indexes
+
+        created = ensure_indexes(db.engine, db.metadata)
+        print(f"✅ Created {len(created)} indexes")
+
+    @app.cli.command("process-images")
+    @click.option("--workers", type=int, default=4, help="Images processed concurrently")
+    @click.option("--force", is_flag=True, help="Reprocess images that already have variants")
+    @click.option("--limit", type=int, default=None, help="Process at most this many images")
+    def process_images_command(workers, force, limit):
+        """Generate WebP card/detail/zoom variants for product images and merchant logos"""
+        from backend.utils.image_pipeline import process_merchant_logos, process_product_images
+
+        products = process_product_images(workers=workers, force=force, limit=limit)
+        logos = process_merchant_logos(workers=workers, force=force, limit=limit)
+        print(
+            f"✅ Processed {products['processed']} product images and {logos['processed']} logos "
+            f"({products['failed'] + logos['failed']} failed)"
+        )
+
+    @app.cli.command("clear-lookup-cache")
+    @click.option("--expired", is_flag=True, help="Only remove expired entries")
+    def clear_lookup_cache_command(expired):
+        """Empty the persistent image lookup cache"""
+        from backend.utils.lookup_cache import lookup_cache
+
+        if expired:
+            print(f"✅ Removed {lookup_cache.purge_expired()} expired lookups")
+        else:
+            lookup_cache.clear()
+            print(f"✅ Cleared {lookup_cache.path}")
+
+    @app.cli.command("build-assets")
+    @click.option("--force", is_flag=True, help="Rebuild variants that are already up to date")
+    def build_assets_command(force):
+        """Write precompressed .gz/.br copies of the static text assets"""
+        from backend.utils.assets import HAS_BROTLI, build_assets
+
+        stats = build_assets(app.static_folder, force=force)
+        if not HAS_BROTLI:
+            print("⚠️  'brotli' is not installed; only .gz variants were built")
+        print(
+            f"✅ Built {stats['built']} compressed assets ({stats['skipped']} up to date), "
+            f"gzip saves {stats['bytes_saved']:,} bytes"
+        )
+
+    @app.cli.command("reap-guest-carts")
+    @click.option("--days", type=int, default=None, help="Inactivity before a guest cart is deleted (default GUEST_CART_TTL_DAYS)")
+    @click.option("--batch-size", type=int, default=1000, help="Rows deleted per batch")
+    @click.option("--max-batches", type=int, default=None, help="Stop after this many batches")
+    @click.option("--pause", type=float, default=0.0, help="Seconds to sleep between batches")
+    @click.option("--interval", type=int, default=None, help="Keep running, reaping every this many seconds")
+    def reap_guest_carts_command(days, batch_size, max_batches, pause, interval):
+        """Delete abandoned guest carts in bounded batches"""
+        import time
+        from backend.utils.cart_gc import guest_cart_cutoff, reap_guest_carts
+
+        days = days if days is not None else app.config["GUEST_CART_TTL_DAYS"]
+        while True:
+            stats = reap_guest_carts(
+                guest_cart_cutoff(days), batch_size=batch_size, max_batches=max_batches, pause=pause
+            )
+            print(
+                f"✅ Deleted {stats['deleted']} guest cart rows older than {days} days "
+                f"in {stats['batches']} batches"
+            )
+            if interval is None:
+                break
+            time.sleep(interval)
+
+    @app.cli.command("cart-stats")
+    @click.option("--days", type=int, default=None, help="Report rows older than this (default GUEST_CART_TTL_DAYS)")
+    def cart_stats_command(days):
+        """Show cart_items size: rows per cart kind, table and index bytes"""
+        from backend.utils.cart_gc import cart_storage_stats, guest_cart_cutoff
+
+        days = days if days is not None else app.config["GUEST_CART_TTL_DAYS"]
+        stats = cart_storage_stats(guest_cart_cutoff(days))
+        print(
+            f"cart_items: {stats['rows']:,} rows ({stats['user_rows']:,} user, "
+            f"{stats['guest_rows']:,} guest in {stats['guest_carts']:,} carts)"
+        )
+        print(f"  abandoned guest rows (> {days} days): {stats['stale_guest_rows']:,}")
+        print(f"  table: {stats['table_bytes']:,} bytes")
+        for name, size in stats['indexes'].items():
+            print(f"  {name}: {size:,} bytes")
+        print(f"  total: {stats['total_bytes']:,} bytes")
+
+    @app.route("/api/metrics/pool")
+    def pool_metrics_view():
+        """Connection pool counters for this process (requires METRICS_TOKEN)"""
+        token = app.config["METRICS_TOKEN"]
+        # Constant-time comparison, so response timing doesn't leak the token
+        authorization = request.headers.get("Authorization", "")
+        if not token or not hmac.compare_digest(authorization.encode(), f"Bearer {token}".encode()):
+            return jsonify({"error": "Not found"}), 404
+        return jsonify(pooling.pool_metrics.snapshot(db.engine.pool))
+
     # Register error handlers to return JSON instead of HTML
     @app.errorhandler(404)
     def not_found(error):
@@ -0,0 +1,207 @@
+"""
+Database connection pooling
+Two modes, picked with DB_POOL_MODE:
+- queue: a sized QueuePool per process, for long-lived servers
+- null: no client-side pool (NullPool) for use behind PgBouncer or Neon's
+  -pooler endpoint, which pool server-side; server-side prepared statements
+  are turned off because a transaction-mode pooler can't keep them per client
+'auto' (default) picks null on Vercel or when the URL points at a pooler, and
+queue otherwise. Both pools are timed: pool_metrics counts checkouts, new
+connections, checkout waits and timeouts per process.
+"""
+
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from sqlalchemy import event, exc, text
+from sqlalchemy.pool import NullPool, QueuePool
+
+POOL_MODES = ('auto', 'queue', 'null')
+
+# Checkouts that wait longer than this count as slow
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class PoolMetrics:
+    """Per-process connection pool counters (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counters = {
+                'checkouts': 0,
+                'checkins': 0,
+                'connects': 0,
+                'invalidations': 0,
+                'timeouts': 0,
+                'slow_checkouts': 0,
+                'wait_seconds_total': 0.0,
+                'wait_seconds_max': 0.0,
+            }
+
+    def increment(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def record_wait(self, seconds, timed_out=False):
+        """One pool checkout: time spent waiting for (or opening) a connection"""
+        with self._lock:
+            counters = self._counters
+            counters['wait_seconds_total'] += seconds
+            counters['wait_seconds_max'] = max(counters['wait_seconds_max'], seconds)
+            if seconds >= SLOW_CHECKOUT_SECONDS:
+                counters['slow_checkouts'] += 1
+            if timed_out:
+                counters['timeouts'] += 1
+
+    def snapshot(self, pool=None):
+        """
+        Current counters, plus the pool's occupancy when one is given.
+
+        Returns:
+            dict: counters, wait_ms_avg / wait_ms_max, and for a QueuePool
+                size, checked_out, overflow and idle
+        """
+        with self._lock:
+            counters = dict(self._counters)
+        # Every checkout attempt was timed, including the ones that timed out
+        attempts = counters['checkouts'] + counters['timeouts']
+        snapshot = {
+            name: value for name, value in counters.items()
+            if not name.startswith('wait_seconds')
+        }
+        snapshot['wait_ms_avg'] = round(counters['wait_seconds_total'] / attempts * 1000, 3) if attempts else 0.0
+        snapshot['wait_ms_max'] = round(counters['wait_seconds_max'] * 1000, 3)
+
+        if isinstance(pool, QueuePool):
+            snapshot['pool'] = {
+                'mode': 'queue',
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+                'idle': pool.checkedin(),
+            }
+        elif pool is not None:
+            snapshot['pool'] = {'mode': 'null'}
+        return snapshot
+
+
+pool_metrics = PoolMetrics()
+
+
+class _TimedPoolMixin:
+    # _do_get is where a checkout blocks for a free slot or opens a connection
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+
+class TimedQueuePool(_TimedPoolMixin, QueuePool):
+    """QueuePool that reports checkout waits to pool_metrics"""
+
+
+class TimedNullPool(_TimedPoolMixin, NullPool):
+    """NullPool that reports connect times to pool_metrics"""
+
+
+def uses_external_pooler(database_url):
+    """Whether the URL points at PgBouncer / a Neon -pooler endpoint"""
+    parts = urlsplit(database_url)
+    params = dict(parse_qsl(parts.query))
+    return '-pooler.' in (parts.hostname or '') or params.get('pgbouncer', '').lower() == 'true'
+
+
+def strip_pooler_params(database_url):
+    """Drop the Prisma-style pgbouncer=true flag, which libpq rejects as an unknown option"""
+    parts = urlsplit(database_url)
+    params = [(key, value) for key, value in parse_qsl(parts.query) if key != 'pgbouncer']
+    return urlunsplit(parts._replace(query=urlencode(params)))
+
+
+def resolve_mode(mode, database_url, serverless):
+    """
+    Pool mode to use.
+
+    Args:
+        mode: DB_POOL_MODE ('auto', 'queue' or 'null')
+        database_url: SQLAlchemy database URL
+        serverless: Running on Vercel (one short-lived process per instance)
+
+    Raises:
+        ValueError: Unknown mode
+    """
+    if mode not in POOL_MODES:
+        raise ValueError(f"DB_POOL_MODE must be one of {', '.join(POOL_MODES)}, got {mode!r}")
+    if mode != 'auto':
+        return mode
+    return 'null' if serverless or uses_external_pooler(database_url) else 'queue'
+
+
+def engine_options(config, connect_args):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the configured pool mode.
+
+    Args:
+        config: App config with DB_POOL_MODE (already resolved), DB_POOL_SIZE,
+            DB_MAX_OVERFLOW, DB_POOL_TIMEOUT and DB_POOL_RECYCLE
+        connect_args: psycopg connect arguments (SSL, connect timeout)
+    """
+    connect_args = dict(connect_args)
+    if config['DB_POOL_MODE'] == 'null':
+        # The pooler owns the connections; pre-ping or recycling would only add round trips.
+        # Transaction-mode poolers hand each transaction a different server connection,
+        # so psycopg must not prepare statements server-side.
+        connect_args['prepare_threshold'] = None
+        return {'poolclass': TimedNullPool, 'connect_args': connect_args}
+
+    return {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        # Fail fast under bursts instead of queueing requests for the default 30s
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': True,
+        # LIFO leaves rarely used connections idle, so server-side idle timeouts can close them
+        'pool_use_lifo': True,
+        'connect_args': connect_args,
+    }
+
+
+def install_metrics(engine):
+    """Count connects, checkouts, checkins and invalidations of an engine's pool"""
+    if getattr(engine, '_pool_metrics_installed', False):
+        return
+    for name, counter in (('connect', 'connects'), ('checkout', 'checkouts'),
+                          ('checkin', 'checkins'), ('invalidate', 'invalidations')):
+        event.listen(engine, name, lambda *args, counter=counter: pool_metrics.increment(counter))
+    engine._pool_metrics_installed = True
+
+
+def warm_pool(engine, connections):
+    """
+    Open connections ahead of the first requests (with NullPool this only
+    wakes the database, e.g. a suspended Neon compute).
+
+    Returns:
+        int: Connections opened
+    """
+    opened = []
+    try:
+        for _ in range(connections):
+            conn = engine.connect()
+            opened.append(conn)
+            conn.execute(text("SELECT 1"))
+    finally:
+        for conn in opened:
+            conn.close()
+    return len(opened)
@@ -0,0 +1,68 @@
+"""
+Schema helpers
+Creates indexes declared on the models that are missing from an existing
+database (db.create_all only creates indexes together with new tables)
+"""
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateIndex
+
+
+def missing_indexes(engine, metadata):
+    """
+    List model indexes that don't exist in the database yet.
+
+    Args:
+        engine: SQLAlchemy engine
+        metadata: MetaData holding the model tables (db.metadata)
+
+    Returns:
+        list: Index objects to create
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    missing = []
+    for table in metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def create_index_concurrently(engine, index):
+    """
+    Build one index with CREATE INDEX CONCURRENTLY so writes to the table
+    are not blocked while it builds. Must run outside a transaction, so it
+    uses an AUTOCOMMIT connection.
+    """
+    ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=engine.dialect))
+    ddl = ddl.replace('INDEX', 'INDEX CONCURRENTLY', 1)
+
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        try:
+            conn.execute(text(ddl))
+        except Exception:
+            # A failed concurrent build leaves an INVALID index behind; drop it
+            # so the next run retries instead of skipping it via IF NOT EXISTS
+            conn.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index.name}"'))
+            raise
+
+
+def ensure_indexes(engine, metadata):
+    """
+    Create every missing model index.
+
+    Returns:
+        list: Names of the indexes that were created
+    """
+    created = []
+    for index in missing_indexes(engine, metadata):
+        try:
+            create_index_concurrently(engine, index)
+            created.append(index.name)
+            print(f"✓ Created index {index.name}")
+        except Exception as e:
+            print(f"Note: Could not create index {index.name}: {e}")
+    return created
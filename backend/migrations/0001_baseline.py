@@ -0,0 +1,21 @@
+"""
+Baseline schema: tables from the models, plus the columns older databases
+were given by hand (users.role, users.default_category, products.merchant_id)
+"""
+
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    from backend.app import db
+    import backend.models  # noqa: F401 - registers every model on db.metadata
+
+    # pg_trgm is required: the products table's fuzzy search index and the
+    # search fallback use its operators, so it must exist before the tables
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+    db.metadata.create_all(bind=conn)
+
+    conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS role VARCHAR(20) DEFAULT 'shopper'"))
+    conn.execute(text("ALTER TABLE users ADD COLUMN IF NOT EXISTS default_category VARCHAR(100)"))
+    conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS merchant_id INTEGER REFERENCES users(id)"))
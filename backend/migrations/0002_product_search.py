@@ -0,0 +1,14 @@
+"""
+Full-text search column on products (generated tsvector)
+"""
+
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    from backend.models.product import SEARCH_VECTOR_EXPRESSION
+
+    conn.execute(text(
+        "ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR_EXPRESSION}) STORED"
+    ))
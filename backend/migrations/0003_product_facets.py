@@ -0,0 +1,12 @@
+"""
+Backfill product_facets counts from the existing products
+"""
+
+from sqlalchemy import select
+
+
+def upgrade(conn):
+    from backend.models.facet import ProductFacet
+
+    if conn.execute(select(ProductFacet.facet).limit(1)).first() is None:
+        ProductFacet.rebuild(conn)
@@ -0,0 +1,28 @@
+"""
+Make products.aliexpress_id unique so bulk ingest can upsert on it
+"""
+
+from sqlalchemy import text
+
+# CREATE INDEX CONCURRENTLY can't run inside a transaction block
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    from backend.app.schema import create_index_concurrently
+    from backend.models.product import Product
+
+    duplicates = conn.execute(text(
+        "SELECT count(*) FROM ("
+        "SELECT aliexpress_id FROM products WHERE aliexpress_id IS NOT NULL "
+        "GROUP BY aliexpress_id HAVING count(*) > 1) AS duplicated"
+    )).scalar()
+    if duplicates:
+        raise RuntimeError(
+            f"{duplicates} aliexpress_id values are shared by several products; "
+            "merge them before running this migration"
+        )
+
+    index = next(index for index in Product.__table__.indexes if index.name == 'uq_products_aliexpress_id')
+    create_index_concurrently(conn.engine, index)
+    conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_products_aliexpress_id"))
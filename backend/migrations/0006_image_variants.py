@@ -0,0 +1,10 @@
+"""
+Content hashes of processed image variants for products and merchant logos
+"""
+
+from sqlalchemy import text
+
+
+def upgrade(conn):
+    conn.execute(text("ALTER TABLE products ADD COLUMN IF NOT EXISTS image_hash VARCHAR(64)"))
+    conn.execute(text("ALTER TABLE merchant_profiles ADD COLUMN IF NOT EXISTS logo_hash VARCHAR(64)"))
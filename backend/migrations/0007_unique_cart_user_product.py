@@ -0,0 +1,37 @@
+"""
+Make cart_items (user_id, product_id) unique so the login cart merge can upsert on it
+"""
+
+from sqlalchemy import text
+
+# CREATE INDEX CONCURRENTLY can't run inside a transaction block
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    from backend.app.schema import create_index_concurrently
+    from backend.models.cart import CartItem
+
+    # Fold duplicate rows left by the old per-item merge into the oldest row;
+    # a single statement, so it is atomic even on the AUTOCOMMIT connection
+    conn.execute(text("""
+        WITH ranked AS (
+            SELECT id,
+                   min(id) OVER (PARTITION BY user_id, product_id) AS keep_id,
+                   sum(quantity) OVER (PARTITION BY user_id, product_id) AS total
+            FROM cart_items
+            WHERE user_id IS NOT NULL
+        ), merged AS (
+            UPDATE cart_items SET quantity = ranked.total
+            FROM ranked
+            WHERE cart_items.id = ranked.id AND ranked.id = ranked.keep_id
+              AND cart_items.quantity <> ranked.total
+        )
+        DELETE FROM cart_items
+        USING ranked
+        WHERE cart_items.id = ranked.id AND ranked.id <> ranked.keep_id
+    """))
+
+    index = next(index for index in CartItem.__table__.indexes if index.name == 'uq_cart_items_user_product')
+    create_index_concurrently(conn.engine, index)
+    conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_cart_items_user_product"))
@@ -0,0 +1,19 @@
+"""
+Partial indexes for guest carts: session lookups and the abandoned cart reaper
+"""
+
+from sqlalchemy import text
+
+# CREATE INDEX CONCURRENTLY can't run inside a transaction block
+TRANSACTIONAL = False
+
+
+def upgrade(conn):
+    from backend.app.schema import create_index_concurrently
+    from backend.models.cart import CartItem
+
+    for index in CartItem.__table__.indexes:
+        if index.name in ('ix_cart_items_guest_session', 'ix_cart_items_guest_updated'):
+            create_index_concurrently(conn.engine, index)
+    # Superseded by the partial ix_cart_items_guest_session, which leaves out user rows
+    conn.execute(text("DROP INDEX CONCURRENTLY IF EXISTS ix_cart_items_session_id"))
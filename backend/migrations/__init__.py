@@ -0,0 +1,161 @@
+"""
+Versioned schema migrations
+Each migration is a module in this package named NNNN_description.py that
+defines upgrade(conn). Applied versions are recorded in the schema_version
+table, so app startup only needs one query to know whether the database is
+current; the schema is changed by `flask db upgrade` (or automatically at
+startup when AUTO_MIGRATE is enabled).
+
+A migration that can't run inside a transaction (e.g. CREATE INDEX
+CONCURRENTLY) sets TRANSACTIONAL = False and receives an AUTOCOMMIT
+connection instead. Fresh databases get their tables from the models in
+0001_baseline, so later migrations must be safe to run against a schema that
+already has their change (ADD COLUMN IF NOT EXISTS and friends).
+"""
+
+import importlib
+import pkgutil
+import re
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, select, text
+from sqlalchemy.exc import ProgrammingError
+
+_MODULE_PATTERN = re.compile(r'^(\d{4})_(\w+)$')
+
+# Arbitrary key for pg_advisory_lock so concurrent instances migrate one at a time
+_LOCK_KEY = 7410352
+
+# Kept out of db.metadata so drop_all/create_all in the setup scripts leave it alone
+schema_version_table = Table(
+    'schema_version',
+    MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('name', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False, default=datetime.utcnow),
+)
+
+
+class Migration:
+    """One migration script"""
+
+    def __init__(self, version, name, module):
+        self.version = version
+        self.name = name
+        self.module = module
+        self.transactional = getattr(module, 'TRANSACTIONAL', True)
+
+    @property
+    def description(self):
+        return (self.module.__doc__ or self.name).strip().splitlines()[0]
+
+    def upgrade(self, conn):
+        self.module.upgrade(conn)
+
+
+def discover():
+    """
+    Load every migration module in this package.
+
+    Returns:
+        list: Migration objects ordered by version
+    """
+    migrations = []
+    for module_info in pkgutil.iter_modules(__path__):
+        match = _MODULE_PATTERN.match(module_info.name)
+        if not match:
+            continue
+        module = importlib.import_module(f'{__name__}.{module_info.name}')
+        migrations.append(Migration(int(match.group(1)), match.group(2), module))
+
+    migrations.sort(key=lambda migration: migration.version)
+    versions = [migration.version for migration in migrations]
+    if len(set(versions)) != len(versions):
+        raise RuntimeError(f"Duplicate migration versions: {versions}")
+    return migrations
+
+
+def latest_version():
+    """Version number of the newest migration script"""
+    migrations = discover()
+    return migrations[-1].version if migrations else 0
+
+
+def current_version(engine):
+    """
+    Version the database is at (0 if it has never been migrated).
+
+    This is the single query app startup runs.
+    """
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_version_table.c.version))).scalar() or 0
+    except ProgrammingError:
+        # schema_version doesn't exist yet
+        return 0
+
+
+def pending(engine):
+    """Migrations newer than the database's current version"""
+    version = current_version(engine)
+    return [migration for migration in discover() if migration.version > version]
+
+
+def upgrade(engine, target=None):
+    """
+    Apply pending migrations in order, up to target (default: latest).
+
+    Holds a Postgres advisory lock for the duration, so several app instances
+    starting at once apply each migration exactly once.
+
+    Returns:
+        list: Versions that were applied
+    """
+    applied = []
+    with engine.connect() as lock_conn:
+        lock_conn.execute(text("SELECT pg_advisory_lock(:key)"), {'key': _LOCK_KEY})
+        lock_conn.commit()
+        try:
+            schema_version_table.create(engine, checkfirst=True)
+
+            for migration in pending(engine):
+                if target is not None and migration.version > target:
+                    break
+                _apply(engine, migration)
+                applied.append(migration.version)
+                print(f"✓ Applied migration {migration.version:04d} {migration.name}")
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': _LOCK_KEY})
+            lock_conn.commit()
+    return applied
+
+
+def _apply(engine, migration):
+    record = schema_version_table.insert().values(
+        version=migration.version, name=migration.name, applied_at=datetime.utcnow()
+    )
+
+    if migration.transactional:
+        # Schema change and version row commit (or roll back) together
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(record)
+    else:
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            migration.upgrade(conn)
+        with engine.begin() as conn:
+            conn.execute(record)
+
+
+def history(engine):
+    """Applied migrations as (version, name, applied_at) rows, oldest first"""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(
+                select(
+                    schema_version_table.c.version,
+                    schema_version_table.c.name,
+                    schema_version_table.c.applied_at,
+                ).order_by(schema_version_table.c.version)
+            ).all()
+    except ProgrammingError:
+        return []
@@ -6,6 +6,7 @@ from backend.models.cart import CartItem
 from backend.models.address import Address
 from backend.models.payment_method import PaymentMethod
 from backend.models.merchant import MerchantProfile
+from backend.models.facet import ProductFacet
 
-__all__ = ['User', 'Product', 'Order', 'OrderItem', 'CartItem', 'Address', 'PaymentMethod', 'MerchantProfile']
+__all__ = ['User', 'Product', 'Order', 'OrderItem', 'CartItem', 'Address', 'PaymentMethod', 'MerchantProfile', 'ProductFacet']
 
@@ -19,6 +19,10 @@ class Address(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_addresses_user_default', 'user_id', 'is_default'),
+    )
+    
     # Relationship
     user = db.relationship('User', backref='addresses')
     
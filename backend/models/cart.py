@@ -1,24 +1,87 @@
 from backend.app import db
+from backend.models.product import Product
 from datetime import datetime
+from sqlalchemy import func, literal, select
+from sqlalchemy.dialects.postgresql import insert
 
 class CartItem(db.Model):
     __tablename__ = 'cart_items'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Nullable for guest carts
-    session_id = db.Column(db.String(255), nullable=True, index=True)  # For guest carts
+    session_id = db.Column(db.String(255), nullable=True)  # For guest carts
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
     quantity = db.Column(db.Integer, default=1, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
-    def to_dict(self):
+    __table_args__ = (
+        # One row per product in a user's cart; the login merge upserts ON CONFLICT
+        # (user_id, product_id). Guest rows have a NULL user_id and never conflict.
+        db.Index('uq_cart_items_user_product', 'user_id', 'product_id', unique=True),
+        # Guest cart lookups; partial, so user carts don't bloat it
+        db.Index('ix_cart_items_guest_session', 'session_id', 'updated_at',
+                 postgresql_where=db.text('session_id IS NOT NULL')),
+        # Abandoned guest cart reaper (backend/utils/cart_gc.py) scans by age
+        db.Index('ix_cart_items_guest_updated', 'updated_at',
+                 postgresql_where=db.text('user_id IS NULL')),
+    )
+    
+    @classmethod
+    def merge_guest_cart(cls, session_id, user_id):
+        """
+        Move a guest cart into a user's cart in two statements: one upsert that
+        adds guest quantities onto existing rows, and one delete of the guest rows.
+        Merged quantities are clamped to stock (but kept at least 1, so an
+        out-of-stock item stays visible in the cart). The sum is computed in the
+        upsert's SELECT, which joins the user's existing row and the product's stock.
+        
+        Runs on db.session; the caller commits.
+        
+        Returns:
+            int: Number of user cart rows inserted or updated
+        """
+        table = cls.__table__
+        existing = table.alias('existing')
+        stock = func.greatest(func.coalesce(Product.stock, 0), 1)
+        
+        # Guest quantity per product plus what the user already has, clamped to stock
+        merged_rows = (
+            select(
+                literal(user_id).label('user_id'),
+                table.c.product_id,
+                func.least(func.sum(table.c.quantity) + func.coalesce(existing.c.quantity, 0), stock).label('quantity'),
+                func.min(table.c.created_at).label('created_at'),
+                func.now().label('updated_at'),
+            )
+            .join(Product, Product.id == table.c.product_id)
+            .outerjoin(existing, (existing.c.user_id == user_id) & (existing.c.product_id == table.c.product_id))
+            .where(table.c.session_id == session_id, table.c.user_id.is_(None))
+            .group_by(table.c.product_id, Product.stock, existing.c.quantity)
+        )
+        statement = insert(table).from_select(
+            ['user_id', 'product_id', 'quantity', 'created_at', 'updated_at'], merged_rows
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.user_id, table.c.product_id],
+            set_={
+                'quantity': statement.excluded.quantity,
+                'updated_at': statement.excluded.updated_at,
+            }
+        )
+        merged = db.session.execute(statement).rowcount
+        db.session.execute(
+            table.delete().where(table.c.session_id == session_id, table.c.user_id.is_(None))
+        )
+        return merged
+    
+    def to_dict(self, product_fields=None):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'product_id': self.product_id,
             'quantity': self.quantity,
-            'product': self.product.to_dict() if self.product else None,
+            'product': self.product.to_dict(product_fields) if self.product else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
@@ -0,0 +1,153 @@
+from backend.app import db
+from backend.models.product import Product
+from datetime import datetime
+from decimal import Decimal
+from sqlalchemy import event, inspect, case, literal, select, func, union_all
+from sqlalchemy.dialects.postgresql import insert
+
+# Price facet buckets: (label, lower bound inclusive, upper bound exclusive or None)
+PRICE_BUCKETS = [
+    ('0-25', 0, 25),
+    ('25-50', 25, 50),
+    ('50-100', 50, 100),
+    ('100-250', 100, 250),
+    ('250+', 250, None),
+]
+
+class ProductFacet(db.Model):
+    """
+    Maintained product counts per filter value, so the category list and the
+    filter sidebar never scan products. Facets: 'category', 'local' ('true' /
+    'false') and 'price' (a PRICE_BUCKETS label). Kept current by the Product
+    mapper events below; rebuild() recomputes everything from scratch.
+    """
+    __tablename__ = 'product_facets'
+
+    facet = db.Column(db.String(20), primary_key=True)
+    value = db.Column(db.String(100), primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'value': self.value,
+            'count': self.product_count
+        }
+
+    @classmethod
+    def rebuild(cls, bind=None):
+        """
+        Recompute all facet counts from the products table (backfill / repair).
+
+        Runs on db.session unless a connection is given (used by migrations).
+        """
+        bind = bind if bind is not None else db.session
+        per_product = select(
+            Product.category.label('category'),
+            _local_value_sql().label('local'),
+            _price_bucket_sql().label('price')
+        ).subquery()
+
+        counts = union_all(*[
+            select(literal(facet).label('facet'), column.label('value'), func.count().label('product_count'))
+                .where(column.isnot(None))
+                .group_by(column)
+            for facet, column in (
+                ('category', per_product.c.category),
+                ('local', per_product.c.local),
+                ('price', per_product.c.price),
+            )
+        ]).subquery()
+
+        bind.execute(cls.__table__.delete())
+        bind.execute(
+            cls.__table__.insert().from_select(
+                ['facet', 'value', 'product_count', 'updated_at'],
+                select(counts.c.facet, counts.c.value, counts.c.product_count, func.now())
+            )
+        )
+
+def price_bucket(price):
+    """PRICE_BUCKETS label for a price"""
+    if price is None:
+        return None
+    try:
+        price = Decimal(str(price))
+    except ArithmeticError:
+        return None
+    for label, low, high in PRICE_BUCKETS:
+        if price >= low and (high is None or price < high):
+            return label
+    return None
+
+def _price_bucket_sql():
+    return case(
+        *[
+            ((Product.price >= low) & (Product.price < high) if high is not None else (Product.price >= low), label)
+            for label, low, high in PRICE_BUCKETS
+        ]
+    )
+
+def _local_value_sql():
+    # Local products are the even ids (see get_products)
+    return case((Product.id % 2 == 0, 'true'), else_='false')
+
+def _facet_values(category, price, product_id):
+    values = []
+    if category:
+        values.append(('category', category))
+    if product_id is not None:
+        values.append(('local', 'true' if product_id % 2 == 0 else 'false'))
+    bucket = price_bucket(price)
+    if bucket:
+        values.append(('price', bucket))
+    return values
+
+def _apply_deltas(connection, deltas):
+    table = ProductFacet.__table__
+    for (facet, value), delta in deltas.items():
+        if delta == 0:
+            continue
+        statement = insert(table).values(
+            facet=facet, value=value, product_count=delta, updated_at=datetime.utcnow()
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.facet, table.c.value],
+            set_={
+                'product_count': table.c.product_count + statement.excluded.product_count,
+                'updated_at': statement.excluded.updated_at,
+            }
+        )
+        connection.execute(statement)
+
+def _add(deltas, values, amount):
+    for key in values:
+        deltas[key] = deltas.get(key, 0) + amount
+
+@event.listens_for(Product, 'after_insert')
+def _product_inserted(mapper, connection, target):
+    deltas = {}
+    _add(deltas, _facet_values(target.category, target.price, target.id), 1)
+    _apply_deltas(connection, deltas)
+
+@event.listens_for(Product, 'after_update')
+def _product_updated(mapper, connection, target):
+    state = inspect(target)
+    category_history = state.attrs.category.history
+    price_history = state.attrs.price.history
+    if not category_history.has_changes() and not price_history.has_changes():
+        return
+
+    old_category = category_history.deleted[0] if category_history.deleted else target.category
+    old_price = price_history.deleted[0] if price_history.deleted else target.price
+
+    deltas = {}
+    _add(deltas, _facet_values(old_category, old_price, target.id), -1)
+    _add(deltas, _facet_values(target.category, target.price, target.id), 1)
+    _apply_deltas(connection, deltas)
+
+@event.listens_for(Product, 'after_delete')
+def _product_deleted(mapper, connection, target):
+    deltas = {}
+    _add(deltas, _facet_values(target.category, target.price, target.id), -1)
+    _apply_deltas(connection, deltas)
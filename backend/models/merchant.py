@@ -1,5 +1,7 @@
 from backend.app import db
 from datetime import datetime
+from sqlalchemy import event
+from backend.utils.image_pipeline import variant_url, variant_urls
 
 class MerchantProfile(db.Model):
     __tablename__ = 'merchant_profiles'
@@ -9,6 +11,7 @@ class MerchantProfile(db.Model):
     business_name = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text)
     logo_url = db.Column(db.String(500))
+    logo_hash = db.Column(db.String(64))  # Content hash of processed WebP variants (see image_pipeline)
     website = db.Column(db.String(200))
     address = db.Column(db.Text)
     city = db.Column(db.String(100))
@@ -32,7 +35,8 @@ class MerchantProfile(db.Model):
             'user_id': self.user_id,
             'business_name': self.business_name,
             'description': self.description,
-            'logo_url': self.logo_url,
+            'logo_url': variant_url(self.logo_hash, 'card') if self.logo_hash else self.logo_url,
+            'logo_images': variant_urls(self.logo_hash),
             'website': self.website,
             'address': self.address,
             'city': self.city,
@@ -48,3 +52,9 @@ class MerchantProfile(db.Model):
             'updated_at': self.updated_at.isoformat() if self.updated_at else None
         }
 
+
+@event.listens_for(MerchantProfile.logo_url, 'set')
+def _logo_url_changed(target, value, oldvalue, initiator):
+    # Processed variants belong to the old logo
+    if value != oldvalue:
+        target.logo_hash = None
@@ -13,10 +13,30 @@ class Order(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        # get_orders: WHERE user_id = ? ORDER BY created_at DESC
+        db.Index('ix_orders_user_created', 'user_id', 'created_at'),
+    )
+    
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy=True, cascade='all, delete-orphan')
     
-    def to_dict(self):
+    @staticmethod
+    def items_loader(lean=False):
+        """
+        Loader option that batch-loads items and their products (selectinload),
+        so serializing any number of orders costs a fixed number of queries.
+        With lean=True only the columns used by Product.to_summary_dict are fetched.
+        """
+        from sqlalchemy.orm import selectinload
+        from backend.models.product import PRODUCT_PROFILES, product_columns
+        
+        loader = selectinload(Order.items).selectinload(OrderItem.product)
+        if lean:
+            loader = loader.load_only(*product_columns(PRODUCT_PROFILES['summary']))
+        return loader
+    
+    def to_dict(self, lean=False):
         return {
             'id': self.id,
             'user_id': self.user_id,
@@ -25,7 +45,7 @@ class Order(db.Model):
             'shipping_address': self.shipping_address,
             'payment_method_id': self.payment_method_id,
             'created_at': self.created_at.isoformat() if self.created_at else None,
-            'items': [item.to_dict() for item in self.items]
+            'items': [item.to_dict(lean=lean) for item in self.items]
         }
 
 class OrderItem(db.Model):
@@ -37,13 +57,22 @@ class OrderItem(db.Model):
     quantity = db.Column(db.Integer, nullable=False)
     price = db.Column(db.Numeric(10, 2), nullable=False)  # Price at time of order
     
-    def to_dict(self):
+    __table_args__ = (
+        # Order.items / selectinload fetch items by order_id
+        db.Index('ix_order_items_order_id', 'order_id'),
+    )
+    
+    def to_dict(self, lean=False):
+        product = None
+        if self.product:
+            product = self.product.to_summary_dict() if lean else self.product.to_dict()
+        
         return {
             'id': self.id,
             'order_id': self.order_id,
             'product_id': self.product_id,
             'quantity': self.quantity,
             'price': float(self.price) if self.price else 0.0,
-            'product': self.product.to_dict() if self.product else None
+            'product': product
         }
 
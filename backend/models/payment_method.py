@@ -16,6 +16,10 @@ class PaymentMethod(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    __table_args__ = (
+        db.Index('ix_payment_methods_user_default', 'user_id', 'is_default'),
+    )
+    
     user = db.relationship('User', backref='payment_methods')
     
     def to_dict(self):
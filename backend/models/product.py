@@ -1,5 +1,16 @@
 from backend.app import db
 from datetime import datetime
+from sqlalchemy import event, func
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from backend.utils.image_pipeline import VARIANTS, variant_url, variant_urls
+from backend.utils.projection import select_columns, serialize
+
+# Weighted full-text document: name matches rank above category, then description
+SEARCH_VECTOR_EXPRESSION = (
+    "setweight(to_tsvector('english', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(category, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -11,6 +22,7 @@ class Product(db.Model):
     stock = db.Column(db.Integer, default=0)
     category = db.Column(db.String(100))
     image_url = db.Column(db.String(500))
+    image_hash = db.Column(db.String(64))  # Content hash of processed WebP variants (see image_pipeline)
     rating = db.Column(db.Numeric(3, 2), default=0.0)
     review_count = db.Column(db.Integer, default=0)
     shipping_time = db.Column(db.String(50))  # e.g., "7-15 days", "15-30 days"
@@ -19,32 +31,115 @@ class Product(db.Model):
     merchant_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)  # Merchant who sells this product
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Generated by Postgres on insert/update; deferred so normal loads don't fetch it
+    search_vector = db.deferred(db.Column(TSVECTOR, db.Computed(SEARCH_VECTOR_EXPRESSION, persisted=True)))
+    
+    __table_args__ = (
+        db.Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'),
+        # Trigram index (pg_trgm) backs the fuzzy fallback for misspelled searches
+        db.Index('ix_products_name_trgm', 'name', postgresql_using='gin', postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_products_category', 'category'),
+        db.Index('ix_products_merchant_id', 'merchant_id'),
+        # Supplier dedup; bulk ingest upserts ON CONFLICT (aliexpress_id)
+        db.Index('uq_products_aliexpress_id', 'aliexpress_id', unique=True),
+    )
     
     # Relationships
     order_items = db.relationship('OrderItem', backref='product', lazy=True)
     cart_items = db.relationship('CartItem', backref='product', lazy=True)
     merchant = db.relationship('User', backref='products', lazy=True)
     
-    def to_dict(self):
-        try:
-            merchant_id = self.merchant_id
-        except (AttributeError, KeyError):
-            merchant_id = None
+    @property
+    def snippet(self):
+        """Shortened description for product cards (selected as left(description, n) in SQL)"""
+        return (self.description or '')[:SNIPPET_LENGTH]
+    
+    def to_dict(self, fields=None):
+        """
+        Serialize the product.
         
-        return {
-            'id': self.id,
-            'name': self.name,
-            'description': self.description,
-            'price': float(self.price) if self.price else 0.0,
-            'stock': self.stock,
-            'category': self.category,
-            'image_url': self.image_url,
-            'rating': float(self.rating) if self.rating else 0.0,
-            'review_count': self.review_count,
-            'shipping_time': self.shipping_time,
-            'shipping_cost': float(self.shipping_cost) if self.shipping_cost else 0.0,
-            'aliexpress_id': self.aliexpress_id,
-            'merchant_id': merchant_id,
-            'created_at': self.created_at.isoformat() if self.created_at else None
-        }
+        Args:
+            fields: Field names from PRODUCT_FIELDS (default: the 'detail' profile)
+        """
+        return serialize(self, PRODUCT_FIELDS, fields or PRODUCT_PROFILES['detail'])
+    
+    def to_summary_dict(self):
+        """Lean projection for embedding in order items and other lists"""
+        return self.to_dict(PRODUCT_PROFILES['summary'])
+
+SNIPPET_LENGTH = 160
+
+def card_image_url(image_url, image_hash):
+    """Listing-size image: the local card variant once processed, else the original"""
+    if image_hash:
+        return variant_url(image_hash, 'card')
+    return image_url
+
+def image_variants(image_url, image_hash):
+    """All image sizes (card, detail, zoom, original); remote original only if unprocessed"""
+    variants = variant_urls(image_hash) or {}
+    if image_url:
+        for variant in VARIANTS:
+            variants.setdefault(variant, image_url)
+    variants['original'] = image_url
+    return variants
+
+def _money(value):
+    # Decimals are handed to the JSON provider as-is (see json_provider)
+    return value if value is not None else 0.0
+
+def _merchant_id(product):
+    # Databases from before the merchant migration may not have the column loaded
+    try:
+        return product.merchant_id
+    except (AttributeError, KeyError):
+        return None
+
+_IMAGE_COLUMNS = (Product.image_url, Product.image_hash)
+
+# Output field -> (columns it reads, serializer). Serializers take a Product or a
+# result row of those columns, so list endpoints can skip building ORM objects.
+PRODUCT_FIELDS = {
+    'id': ((Product.id,), lambda p: p.id),
+    'name': ((Product.name,), lambda p: p.name),
+    'description': ((Product.description,), lambda p: p.description),
+    'snippet': ((func.left(Product.description, SNIPPET_LENGTH).label('snippet'),), lambda p: p.snippet or ''),
+    'price': ((Product.price,), lambda p: _money(p.price)),
+    'stock': ((Product.stock,), lambda p: p.stock),
+    'category': ((Product.category,), lambda p: p.category),
+    'image_url': (_IMAGE_COLUMNS, lambda p: card_image_url(p.image_url, p.image_hash)),
+    'images': (_IMAGE_COLUMNS, lambda p: image_variants(p.image_url, p.image_hash)),
+    'rating': ((Product.rating,), lambda p: _money(p.rating)),
+    'review_count': ((Product.review_count,), lambda p: p.review_count),
+    'shipping_time': ((Product.shipping_time,), lambda p: p.shipping_time),
+    'shipping_cost': ((Product.shipping_cost,), lambda p: _money(p.shipping_cost)),
+    'aliexpress_id': ((Product.aliexpress_id,), lambda p: p.aliexpress_id),
+    'merchant_id': ((Product.merchant_id,), _merchant_id),
+    'created_at': ((Product.created_at,), lambda p: p.created_at),
+    'updated_at': ((Product.updated_at,), lambda p: p.updated_at),
+}
+
+# Named field sets for ?profile=
+PRODUCT_PROFILES = {
+    # The full product payload (no snippet; updated_at only on request)
+    'detail': tuple(name for name in PRODUCT_FIELDS if name not in ('snippet', 'updated_at')),
+    # Product grid cards
+    'card': ('id', 'name', 'snippet', 'price', 'stock', 'category', 'image_url',
+             'rating', 'review_count', 'shipping_time', 'merchant_id'),
+    # Embedded in cart and order items
+    'summary': ('id', 'name', 'price', 'image_url'),
+}
+
+def product_columns(fields):
+    """Product attributes to load_only() when an ORM query serializes just these fields"""
+    return [
+        getattr(Product, expression.key)
+        for expression in select_columns(PRODUCT_FIELDS, fields)
+        if hasattr(Product, expression.key) and expression.key != 'snippet'
+    ]
 
+@event.listens_for(Product.image_url, 'set')
+def _image_url_changed(target, value, oldvalue, initiator):
+    # Processed variants belong to the old image
+    if value != oldvalue:
+        target.image_hash = None
@@ -5,56 +5,73 @@ Fetches products from AliExpress API and populates the database
 
 import requests
 import random
-from backend.app import db
-from backend.models.product import Product
+from backend.utils.ingest import DEFAULT_CHUNK_SIZE, ingest_products
 
 # AliExpress API endpoints (using RapidAPI or similar service)
 # For testing, we'll use a mock implementation that can be swapped with real API
 ALIEXPRESS_API_BASE = "https://aliexpress-data.p.rapidapi.com"
 
-def fetch_aliexpress_products(api_key=None, count=100):
+def fetch_aliexpress_products(api_key=None, count=100, page_size=50):
     """
     Fetch products from AliExpress API
     
     Args:
         api_key: API key for AliExpress API (optional, will use mock data if not provided)
         count: Number of products to fetch (default: 100)
+        page_size: Products requested per API call
     
-    Returns:
-        List of product dictionaries
+    Yields:
+        Product dictionaries, one page at a time, so large imports never hold
+        the whole feed in memory
     """
     if not api_key:
         # Return mock data for testing
-        return generate_mock_products(count)
+        yield from generate_mock_products(count)
+        return
     
     # Real API implementation would go here
     # This is a placeholder for when you have API credentials
-    try:
-        headers = {
-            "X-RapidAPI-Key": api_key,
-            "X-RapidAPI-Host": "aliexpress-data.p.rapidapi.com"
-        }
-        
-        # Example API call (adjust based on actual API documentation)
-        response = requests.get(
-            f"{ALIEXPRESS_API_BASE}/product/search",
-            headers=headers,
-            params={"keyword": "", "page": "1", "pageSize": str(count)}
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            return parse_aliexpress_response(data)
-        else:
-            print(f"API Error: {response.status_code}")
-            return generate_mock_products(count)
-    except Exception as e:
-        print(f"Error fetching from API: {e}")
-        return generate_mock_products(count)
+    headers = {
+        "X-RapidAPI-Key": api_key,
+        "X-RapidAPI-Host": "aliexpress-data.p.rapidapi.com"
+    }
+    
+    fetched = 0
+    page = 1
+    with requests.Session() as http:
+        while fetched < count:
+            try:
+                # Example API call (adjust based on actual API documentation)
+                response = http.get(
+                    f"{ALIEXPRESS_API_BASE}/product/search",
+                    headers=headers,
+                    params={"keyword": "", "page": str(page), "pageSize": str(min(page_size, count - fetched))},
+                    timeout=30
+                )
+            except Exception as e:
+                print(f"Error fetching from API: {e}")
+                break
+            
+            if response.status_code != 200:
+                print(f"API Error: {response.status_code}")
+                break
+            
+            products = parse_aliexpress_response(response.json())
+            if not products:
+                break
+            
+            for product in products[:count - fetched]:
+                yield product
+            fetched += min(len(products), count - fetched)
+            page += 1
+    
+    if fetched == 0:
+        # Nothing came back from the API, fall back to mock data
+        yield from generate_mock_products(count)
 
 def generate_mock_products(count=100):
     """
-    Generate mock AliExpress-style products for testing
+    Generate mock AliExpress-style products for testing (yields one dict at a time)
     """
     categories = [
         "Electronics", "Home & Garden", "Fashion", "Sports & Outdoors",
@@ -118,7 +135,6 @@ def generate_mock_products(count=100):
         "7-15 days", "10-20 days", "15-30 days", "20-40 days", "5-12 days"
     ]
     
-    products = []
     for i in range(count):
         template = random.choice(product_templates)
         variation = random.randint(1, 5)
@@ -147,9 +163,7 @@ def generate_mock_products(count=100):
             "shipping_cost": round(random.uniform(0, 5.99), 2),
             "aliexpress_id": f"ALX{random.randint(100000, 999999)}"
         }
-        products.append(product)
-    
-    return products
+        yield product
 
 def parse_aliexpress_response(data):
     """
@@ -161,7 +175,8 @@ def parse_aliexpress_response(data):
     # Placeholder implementation
     return products
 
-def populate_products_from_aliexpress(api_key=None, count=100, app_context=None):
+def populate_products_from_aliexpress(api_key=None, count=100, app_context=None,
+                                      chunk_size=DEFAULT_CHUNK_SIZE, update_existing=False):
     """
     Fetch products from AliExpress and add them to the database
     
@@ -169,6 +184,12 @@ def populate_products_from_aliexpress(api_key=None, count=100, app_context=None)
         api_key: API key for AliExpress API (optional)
         count: Number of products to fetch
         app_context: Flask app context (optional, will create if not provided)
+        chunk_size: Records written per COPY batch
+        update_existing: Refresh products that already exist (matched on
+            aliexpress_id) instead of skipping them
+    
+    Returns:
+        Number of products added
     """
     from flask import has_app_context
     
@@ -183,43 +204,25 @@ def populate_products_from_aliexpress(api_key=None, count=100, app_context=None)
         should_pop = False
     
     try:
-        products_data = fetch_aliexpress_products(api_key, count)
-        
-        added_count = 0
-        skipped_count = 0
-        
-        for product_data in products_data:
-            # Check if product already exists
-            existing = Product.query.filter_by(aliexpress_id=product_data.get('aliexpress_id')).first()
-            if existing:
-                skipped_count += 1
-                continue
-            
-            product = Product(
-                name=product_data['name'],
-                description=product_data.get('description', ''),
-                price=product_data['price'],
-                stock=product_data.get('stock', 100),
-                category=product_data.get('category', 'Uncategorized'),
-                image_url=product_data.get('image_url'),
-                rating=product_data.get('rating', 0.0),
-                review_count=product_data.get('review_count', 0),
-                shipping_time=product_data.get('shipping_time', '15-30 days'),
-                shipping_cost=product_data.get('shipping_cost', 0.0),
-                aliexpress_id=product_data.get('aliexpress_id')
-            )
-            
-            db.session.add(product)
-            added_count += 1
-        
-        db.session.commit()
+        stats = ingest_products(
+            fetch_aliexpress_products(api_key, count),
+            chunk_size=chunk_size,
+            update_existing=update_existing
+        )
         
-        print(f"✅ Added {added_count} products to database")
-        if skipped_count > 0:
-            print(f"⚠️  Skipped {skipped_count} duplicate products")
+        print(f"✅ Added {stats['inserted']} products to database")
+        if stats['updated'] > 0:
+            print(f"✅ Updated {stats['updated']} existing products")
+        if stats['skipped'] > 0:
+            print(f"⚠️  Skipped {stats['skipped']} duplicate products")
+        if stats['invalid'] > 0:
+            print(f"⚠️  Skipped {stats['invalid']} products without a name or price")
+        print(
+            f"⏱️  {stats['processed']:,} records in {stats['seconds']}s "
+            f"({stats['rows_per_second']:,.0f} records/s, {stats['chunks']} chunks of {chunk_size})"
+        )
         
-        return added_count
+        return stats['inserted']
     finally:
         if should_pop:
             ctx.pop()
-
@@ -0,0 +1,194 @@
+"""
+Static assets and response compression
+- asset_url(): template helper emitting /static/<path>?v=<content hash>; versioned
+  URLs are served with a year-long immutable Cache-Control
+- build_assets(): writes precompressed .gz / .br siblings of text assets once,
+  which the static view serves to clients that accept them
+- compress_response(): after_request hook that gzip/brotli-encodes dynamic
+  responses (JSON, HTML) above a size threshold
+"""
+
+import gzip
+import hashlib
+import io
+import mimetypes
+import os
+import threading
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+# Text formats worth compressing; images and fonts are already compressed
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'text/javascript', 'text/html',
+    'text/css', 'text/plain', 'image/svg+xml',
+}
+COMPRESSIBLE_EXTENSIONS = ('.js', '.css', '.json', '.svg', '.html', '.txt')
+
+# Precompressed sibling suffix per content coding, in server preference order
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+IMMUTABLE_POLICY = 'public, max-age=31536000, immutable'
+
+# Directories under static/ that hold user or pipeline output, not build assets
+SKIP_DIRS = ('uploads', 'media')
+
+_hashes = {}
+_hashes_lock = threading.Lock()
+
+
+def asset_hash(filename):
+    """
+    Short content hash of a static file, recomputed only when its mtime changes.
+
+    Returns:
+        str or None: 12 hex characters, or None if the file doesn't exist
+    """
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+    cached = _hashes.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    with _hashes_lock:
+        _hashes[filename] = (mtime, digest)
+    return digest
+
+
+def asset_url(filename):
+    """Template helper: static URL that changes whenever the file's content does"""
+    digest = asset_hash(filename)
+    if digest is None:
+        return url_for('static', filename=filename)
+    return url_for('static', filename=filename, v=digest)
+
+
+def _accepts(coding):
+    # Quality lookup honours wildcards and explicit q=0 refusals
+    return request.accept_encodings[coding] > 0
+
+
+def serve_static(filename):
+    """
+    Static view: serves a precompressed .br / .gz sibling when the client
+    accepts it, and marks URLs carrying the current content hash as immutable.
+    """
+    static_folder = current_app.static_folder
+
+    response = None
+    for coding, suffix in PRECOMPRESSED:
+        if not _accepts(coding):
+            continue
+        compressed = os.path.join(static_folder, filename + suffix)
+        original = os.path.join(static_folder, filename)
+        # Only use a variant built from the current version of the file
+        if os.path.isfile(compressed) and os.path.isfile(original) \
+                and os.stat(compressed).st_mtime >= os.stat(original).st_mtime:
+            mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+            response = send_from_directory(static_folder, filename + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = coding
+            break
+
+    if response is None:
+        response = send_from_directory(static_folder, filename)
+
+    response.vary.add('Accept-Encoding')
+    version = request.args.get('v')
+    if version and version == asset_hash(filename):
+        response.headers['Cache-Control'] = IMMUTABLE_POLICY
+    return response
+
+
+def _gzip(data, level):
+    # mtime=0 keeps the output identical for identical input
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=level, mtime=0) as f:
+        f.write(data)
+    return buffer.getvalue()
+
+
+def build_assets(static_folder, force=False):
+    """
+    Write .gz (and .br, with the optional 'brotli' package) next to every
+    compressible static file, at maximum compression. Up-to-date variants are skipped.
+
+    Args:
+        static_folder: Root of the static files
+        force: Rebuild every variant
+
+    Returns:
+        dict: built, skipped and bytes_saved (original minus gzip size)
+    """
+    stats = {'built': 0, 'skipped': 0, 'bytes_saved': 0}
+    encoders = [('.gz', lambda data: _gzip(data, 9))]
+    if HAS_BROTLI:
+        encoders.append(('.br', lambda data: brotli.compress(data, quality=11)))
+
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            mtime = os.stat(path).st_mtime
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            for suffix, encode in encoders:
+                target = path + suffix
+                if not force and os.path.exists(target) and os.stat(target).st_mtime >= mtime:
+                    stats['skipped'] += 1
+                    continue
+                encoded = encode(data)
+                if len(encoded) >= len(data):
+                    continue
+                with open(target, 'wb') as f:
+                    f.write(encoded)
+                stats['built'] += 1
+                if suffix == '.gz':
+                    stats['bytes_saved'] += len(data) - len(encoded)
+
+    return stats
+
+
+def compress_response(response):
+    """
+    after_request hook: compress dynamic text responses above
+    COMPRESS_MIN_SIZE with brotli (when installed and accepted) or gzip.
+    """
+    config = current_app.config
+    if not config.get('COMPRESS_ENABLED', True):
+        return response
+    if (response.status_code < 200 or response.status_code in (204, 206, 304)
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    # Responses vary by encoding even when this one ends up uncompressed
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < config.get('COMPRESS_MIN_SIZE', 1024):
+        return response
+
+    if HAS_BROTLI and _accepts('br'):
+        encoded, coding = brotli.compress(data, quality=config.get('COMPRESS_BROTLI_QUALITY', 4)), 'br'
+    elif _accepts('gzip'):
+        encoded, coding = _gzip(data, config.get('COMPRESS_GZIP_LEVEL', 6)), 'gzip'
+    else:
+        return response
+
+    response.set_data(encoded)
+    response.headers['Content-Encoding'] = coding
+    return response
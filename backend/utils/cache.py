@@ -0,0 +1,214 @@
+"""
+Read-through response cache
+In-process LRU with per-entry TTL by default, or a Redis-compatible server when
+CACHE_BACKEND=redis. Entries are grouped into namespaces whose generation number
+is part of every key, so a whole namespace is invalidated by bumping it.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from backend.utils.json_provider import dumps as json_dumps, loads as json_loads
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+# Namespaces used by the catalog endpoints
+PRODUCT_NAMESPACE = 'product'            # single product payloads, keyed by id
+PRODUCT_LISTING_NAMESPACE = 'products'   # listings, categories and other aggregates
+
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def generation(self, namespace):
+        # Kept outside the LRU so evictions can never roll a namespace back
+        return self._generations.get(namespace, 0)
+
+    def bump_generation(self, namespace):
+        with self._lock:
+            self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            return self._generations[namespace]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class RedisCache:
+    """Cache backed by a Redis-compatible server; values are stored as JSON"""
+
+    def __init__(self, url, prefix='congo:'):
+        if not HAS_REDIS:
+            raise RuntimeError("CACHE_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self._client = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+
+    def get(self, key):
+        raw = self._client.get(self.prefix + key)
+        return json_loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None):
+        self._client.set(self.prefix + key, json_dumps(value), ex=ttl or None)
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def generation(self, namespace):
+        return int(self._client.get(f"{self.prefix}gen:{namespace}") or 0)
+
+    def bump_generation(self, namespace):
+        return self._client.incr(f"{self.prefix}gen:{namespace}")
+
+    def clear(self):
+        for key in self._client.scan_iter(f"{self.prefix}*"):
+            self._client.delete(key)
+
+
+class Cache:
+    """
+    Read-through cache used by the API blueprints.
+
+    Configured from the app config in create_app:
+        CACHE_BACKEND: 'memory' (default), 'redis' or 'none'
+        CACHE_REDIS_URL: Redis URL when CACHE_BACKEND=redis
+        CACHE_DEFAULT_TTL: Seconds an entry stays valid (default 300)
+        CACHE_MAX_ENTRIES: LRU capacity for the memory backend (default 1024)
+
+    The memory backend is per process, so invalidation only reaches the
+    process that made the change; the TTL bounds staleness elsewhere.
+    """
+
+    def __init__(self):
+        self.backend = LRUCache()
+        self.default_ttl = 300
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+
+        if backend == 'none':
+            self.backend = None
+        elif backend == 'redis':
+            self.backend = RedisCache(app.config['CACHE_REDIS_URL'])
+        else:
+            self.backend = LRUCache(app.config.get('CACHE_MAX_ENTRIES', 1024))
+
+        app.extensions['cache'] = self
+
+    @staticmethod
+    def make_key(*parts, args=None):
+        """
+        Build a cache key from fixed parts plus normalized query args.
+
+        Args are sorted and blank values dropped, so "?b=2&a=1&c=" and
+        "?a=1&b=2" share an entry.
+        """
+        key = ':'.join(str(part) for part in parts)
+        if args:
+            items = sorted(
+                (name, value)
+                for name in args
+                for value in (args.getlist(name) if hasattr(args, 'getlist') else [args[name]])
+                if value not in (None, '')
+            )
+            key += '?' + '&'.join(f'{name}={value}' for name, value in items)
+        return key
+
+    def _generation(self, namespace):
+        return self._safe(self.backend.generation, namespace) or 0
+
+    def _namespaced(self, namespace, key):
+        return f'{namespace}:{self._generation(namespace)}:{key}'
+
+    def get_or_set(self, namespace, key, loader, ttl=None):
+        """
+        Return the cached value for key, calling loader() to fill it on a miss.
+
+        Loader results of None are returned but not cached.
+        """
+        if self.backend is None:
+            return loader()
+
+        full_key = self._namespaced(namespace, key)
+        value = self._safe(self.backend.get, full_key)
+        if value is not None:
+            return value
+
+        value = loader()
+        if value is not None:
+            self._safe(self.backend.set, full_key, value, ttl or self.default_ttl)
+        return value
+
+    def delete(self, namespace, key):
+        if self.backend is not None:
+            self._safe(self.backend.delete, self._namespaced(namespace, key))
+
+    def invalidate(self, namespace):
+        """Drop every entry in a namespace by moving it to a new generation"""
+        if self.backend is not None:
+            self._safe(self.backend.bump_generation, namespace)
+
+    def clear(self):
+        if self.backend is not None:
+            self._safe(self.backend.clear)
+
+    @staticmethod
+    def _safe(operation, *args):
+        # A cache outage must never fail the request; treat it as a miss
+        try:
+            return operation(*args)
+        except Exception as e:
+            print(f"⚠️  Cache error ({operation.__name__}): {e}")
+            return None
+
+
+cache = Cache()
+
+
+def invalidate_products(product_ids=None):
+    """
+    Invalidation hook for catalog changes.
+
+    Drops the cached payloads of the given products (or all products when
+    product_ids is None) and every listing/aggregate that may include them.
+    """
+    if product_ids is None:
+        cache.invalidate(PRODUCT_NAMESPACE)
+    else:
+        for product_id in set(product_ids):
+            cache.delete(PRODUCT_NAMESPACE, product_id)
+    cache.invalidate(PRODUCT_LISTING_NAMESPACE)
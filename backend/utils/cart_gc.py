@@ -0,0 +1,115 @@
+"""
+Guest cart garbage collection
+Guest carts live in cart_items keyed by a per-browser session_id and are
+abandoned by most visitors (and every bot). reap_guest_carts() deletes guest
+carts with no activity since a cutoff, in short batches that each commit on
+their own, so it never holds long locks. cart_storage_stats() reports how big
+the table and its indexes are, and how much of that the reaper could free.
+"""
+
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from backend.app import db
+
+DEFAULT_TTL_DAYS = 30
+DEFAULT_BATCH_SIZE = 1000
+
+# Guest rows whose whole cart (every row of the session) is older than :cutoff.
+# ix_cart_items_guest_updated drives the scan; ix_cart_items_guest_session the probe.
+_STALE_GUEST_ROWS = """
+    FROM cart_items AS c
+    WHERE c.user_id IS NULL
+      AND c.updated_at < :cutoff
+      AND NOT EXISTS (
+          SELECT 1 FROM cart_items AS recent
+          WHERE recent.session_id = c.session_id
+            AND recent.user_id IS NULL
+            AND recent.updated_at >= :cutoff
+      )
+"""
+
+
+def guest_cart_cutoff(ttl_days=DEFAULT_TTL_DAYS):
+    """Guest carts untouched since this moment are abandoned"""
+    return datetime.utcnow() - timedelta(days=ttl_days)
+
+
+def reap_guest_carts(cutoff, batch_size=DEFAULT_BATCH_SIZE, max_batches=None, pause=0.0):
+    """
+    Delete abandoned guest carts in bounded batches.
+
+    Args:
+        cutoff: Guest carts with no row updated at or after this datetime are deleted
+        batch_size: Rows deleted per statement (and per commit)
+        max_batches: Stop after this many batches (None: until nothing is left)
+        pause: Seconds to sleep between batches, to leave room for live traffic
+
+    Returns:
+        dict: deleted rows and batches run
+    """
+    stats = {'deleted': 0, 'batches': 0}
+    statement = text(f"""
+        DELETE FROM cart_items WHERE id IN (
+            SELECT c.id {_STALE_GUEST_ROWS}
+            ORDER BY c.updated_at
+            LIMIT :batch_size
+            FOR UPDATE SKIP LOCKED
+        )
+    """)
+
+    while max_batches is None or stats['batches'] < max_batches:
+        try:
+            deleted = db.session.execute(statement, {'cutoff': cutoff, 'batch_size': batch_size}).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        stats['batches'] += 1
+        stats['deleted'] += deleted
+        if deleted < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    return stats
+
+
+def cart_storage_stats(cutoff=None):
+    """
+    Size of the cart_items table and its indexes, with row counts per cart kind.
+
+    Args:
+        cutoff: Also count the guest rows reap_guest_carts(cutoff) would delete
+
+    Returns:
+        dict: rows, user_rows, guest_rows, guest_carts, stale_guest_rows (with a
+            cutoff), table_bytes, indexes ({name: bytes}) and total_bytes
+    """
+    counts = db.session.execute(text("""
+        SELECT count(*) AS rows,
+               count(*) FILTER (WHERE user_id IS NOT NULL) AS user_rows,
+               count(*) FILTER (WHERE user_id IS NULL) AS guest_rows,
+               count(DISTINCT session_id) FILTER (WHERE user_id IS NULL) AS guest_carts
+        FROM cart_items
+    """)).mappings().one()
+    stats = dict(counts)
+
+    if cutoff is not None:
+        stats['stale_guest_rows'] = db.session.execute(
+            text(f"SELECT count(*) {_STALE_GUEST_ROWS}"), {'cutoff': cutoff}
+        ).scalar()
+
+    stats['table_bytes'] = db.session.execute(
+        text("SELECT pg_table_size('cart_items')")
+    ).scalar()
+    stats['indexes'] = {
+        name: size for name, size in db.session.execute(text("""
+            SELECT indexrelname, pg_relation_size(indexrelid)
+            FROM pg_stat_user_indexes
+            WHERE relname = 'cart_items'
+            ORDER BY indexrelname
+        """))
+    }
+    stats['total_bytes'] = stats['table_bytes'] + sum(stats['indexes'].values())
+    return stats
@@ -5,16 +5,27 @@ Fetches images from Google Image Search for products that don't have image URLs
 
 import os
 from backend.models.product import Product
-from backend.utils.image_search import fetch_images_for_products
+from backend.utils.image_search import iter_product_images
+from backend.utils.cache import invalidate_products
 
-def ensure_product_images(app_context=None, force_refresh=False):
+# Products written per commit while image lookups stream in
+COMMIT_BATCH_SIZE = 200
+
+def ensure_product_images(app_context=None, force_refresh=False, workers=8, rate=3.0,
+                          batch_size=COMMIT_BATCH_SIZE):
     """
     Ensure all products in the database have image URLs.
     Fetches images for products that don't have them.
     
+    Lookups run concurrently (rate-limited per upstream host) and results are
+    committed in batches as they arrive, so progress survives interruptions.
+    
     Args:
         app_context: Flask app context (optional)
         force_refresh: If True, refresh images for all products (default: False)
+        workers: Concurrent image lookups
+        rate: Requests per second allowed to each upstream host
+        batch_size: Products updated per commit
     
     Returns:
         int: Number of products updated with images
@@ -32,49 +43,69 @@ def ensure_product_images(app_context=None, force_refresh=False):
         should_pop = False
     
     try:
-        # Get products that need images
-        if force_refresh:
-            products = Product.query.all()
-        else:
-            from sqlalchemy import or_
-            products = Product.query.filter(
+        from backend.app import db
+        from sqlalchemy import or_, update
+        
+        # Only ids and names are needed to look images up
+        query = db.session.query(Product.id, Product.name)
+        if not force_refresh:
+            query = query.filter(
                 or_(
                     Product.image_url.is_(None),
                     Product.image_url == '',
                     Product.image_url.like('%placeholder%')
                 )
-            ).all()
+            )
+        
+        ids_by_name = {}
+        for product_id, name in query:
+            ids_by_name.setdefault(name, []).append(product_id)
         
-        if not products:
-            if should_pop:
-                ctx.pop()
+        if not ids_by_name:
             return 0
         
-        print(f"🖼️  Found {len(products)} products that need images...")
+        product_count = sum(len(ids) for ids in ids_by_name.values())
+        print(f"🖼️  Found {product_count} products that need images...")
         
         # Get Google API credentials from environment (optional)
         google_api_key = os.getenv('GOOGLE_API_KEY')
         google_search_engine_id = os.getenv('GOOGLE_SEARCH_ENGINE_ID')
         
-        # Fetch images
-        image_urls = fetch_images_for_products(
-            products,
+        updated_count = 0
+        pending = []
+        
+        def flush():
+            nonlocal updated_count
+            if not pending:
+                return
+            # Bulk UPDATE by primary key: one executemany per batch
+            db.session.execute(update(Product), pending)
+            db.session.commit()
+            invalidate_products([row['id'] for row in pending])
+            updated_count += len(pending)
+            print(f"   … {updated_count}/{product_count} products updated")
+            pending.clear()
+        
+        for name, image_url in iter_product_images(
+            ({'name': name} for name in ids_by_name),
             api_key=google_api_key,
             search_engine_id=google_search_engine_id,
-            delay=0.3
-        )
+            workers=workers,
+            rate=rate
+        ):
+            if not image_url:
+                continue
+            pending.extend(
+                # Processed variants belong to the old image
+                {'id': product_id, 'image_url': image_url, 'image_hash': None}
+                for product_id in ids_by_name[name]
+            )
+            if len(pending) >= batch_size:
+                flush()
         
-        # Update products with images
-        updated_count = 0
-        from backend.app import db
-        
-        for product in products:
-            if product.name in image_urls and image_urls[product.name]:
-                product.image_url = image_urls[product.name]
-                updated_count += 1
+        flush()
         
         if updated_count > 0:
-            db.session.commit()
             print(f"✅ Updated {updated_count} products with images")
         else:
             print("ℹ️  No products needed image updates")
@@ -84,4 +115,3 @@ def ensure_product_images(app_context=None, force_refresh=False):
     finally:
         if should_pop:
             ctx.pop()
-
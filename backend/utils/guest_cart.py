@@ -0,0 +1,129 @@
+"""
+Cookie-resident guest carts
+With GUEST_CART_STORAGE=session, an anonymous visitor's cart lives in the
+signed Flask session cookie as [[product_id, quantity], ...] (oldest first)
+instead of cart_items rows, so window shoppers and crawlers never write to the
+database, and their cart is rendered from the product cache. The cart moves
+into cart_items when the visitor logs in or registers, or when it outgrows
+GUEST_CART_MAX_ITEMS products (browsers cap a cookie at about 4 kB).
+"""
+
+from datetime import datetime, timedelta
+from flask import current_app, session
+from backend.utils.identity import get_current_user_id
+
+SESSION_KEY = 'guest_cart'
+
+# Set once a guest's cart has moved to cart_items; it stays there until login
+MATERIALIZED_KEY = 'guest_cart_materialized'
+
+
+def active():
+    """True when this request's cart is a cookie cart (session mode, anonymous, not moved to the database)"""
+    return (
+        current_app.config.get('GUEST_CART_STORAGE') == 'session'
+        and not session.get(MATERIALIZED_KEY)
+        and not get_current_user_id()
+    )
+
+
+def read():
+    """
+    The cookie cart.
+
+    Returns:
+        dict: product_id -> quantity, oldest first
+    """
+    return {product_id: quantity for product_id, quantity in session.get(SESSION_KEY, [])}
+
+
+def write(items):
+    """Store the cart (product_id -> quantity) back in the cookie"""
+    if items:
+        session[SESSION_KEY] = [[product_id, quantity] for product_id, quantity in items.items()]
+    else:
+        session.pop(SESSION_KEY, None)
+
+
+def fits(items):
+    """Whether a cart is small enough to stay in the cookie"""
+    return len(items) <= current_app.config.get('GUEST_CART_MAX_ITEMS', 50)
+
+
+def cached_stock(product_ids):
+    """
+    Stock of each product from the product cache (products missing from the catalog are left out).
+
+    Checkout re-checks stock under row locks, so a briefly stale value is harmless here.
+    """
+    from backend.api.products import get_product_payload
+
+    stock = {}
+    for product_id in product_ids:
+        payload = get_product_payload(product_id, ('stock',))
+        if payload is not None:
+            stock[product_id] = payload['stock']
+    return stock
+
+
+def item_payload(product_id, quantity, fields):
+    """One cart entry in the shape of CartItem.to_dict(); the product id doubles as the item id"""
+    from backend.api.products import get_product_payload
+
+    product = get_product_payload(product_id, fields)
+    if product is None:
+        return None
+    return {
+        'id': product_id,
+        'user_id': None,
+        'product_id': product_id,
+        'quantity': quantity,
+        'product': product,
+        'created_at': None,
+    }
+
+
+def payload(items, fields):
+    """The cart as GET /api/cart/ returns it, newest first, hydrated from the product cache"""
+    entries = (item_payload(product_id, quantity, fields) for product_id, quantity in reversed(list(items.items())))
+    return [entry for entry in entries if entry is not None]
+
+
+def summary(items):
+    """Count, subtotal and product ids (newest first) of a cookie cart, priced from the product cache"""
+    from backend.api.products import get_product_payload
+
+    result = {'count': 0, 'subtotal': 0, 'product_ids': []}
+    for product_id, quantity in reversed(list(items.items())):
+        product = get_product_payload(product_id, ('price',))
+        if product is None:
+            continue
+        result['count'] += quantity
+        result['subtotal'] += product['price'] * quantity
+        result['product_ids'].append(product_id)
+    return result
+
+
+def materialize(session_id):
+    """
+    Move the cookie cart into cart_items rows under the guest's session_id and
+    keep this session on database storage from now on. The caller commits.
+
+    Returns:
+        int: Rows added
+    """
+    from backend.app import db
+    from backend.models.cart import CartItem
+
+    items = read()
+    if items:
+        now = datetime.utcnow()
+        # Microsecond steps keep the cart's order (newest first) in created_at
+        db.session.execute(CartItem.__table__.insert(), [
+            {'session_id': session_id, 'product_id': product_id, 'quantity': quantity,
+             'created_at': now + timedelta(microseconds=position), 'updated_at': now}
+            for position, (product_id, quantity) in enumerate(items.items())
+        ])
+    session.pop(SESSION_KEY, None)
+    session[MATERIALIZED_KEY] = True
+    return len(items)
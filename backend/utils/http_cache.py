@@ -0,0 +1,94 @@
+"""
+HTTP conditional requests
+Catalog endpoints compute a cheap validator (e.g. the product's updated_at, or
+a hash of a listing page's ids and updated_at values, cached with the page).
+Requests whose If-None-Match / If-Modified-Since still match get a 304 Not
+Modified without the payload being serialized.
+"""
+
+import hashlib
+from datetime import datetime, timezone
+from flask import current_app, request
+
+# Cache-Control per route group; browsers and CDNs revalidate with the validators
+CACHE_POLICIES = {
+    'product': 'public, max-age=60, stale-while-revalidate=300',
+    'listing': 'public, max-age=30, stale-while-revalidate=120',
+    'catalog_meta': 'public, max-age=300, stale-while-revalidate=600',
+    'merchant': 'public, max-age=60, stale-while-revalidate=300',
+}
+
+# Default for API responses without a policy (carts, users, orders)
+PRIVATE_POLICY = 'private, no-cache'
+
+# Bump when payload formats change, so clients don't keep stale representations
+ETAG_VERSION = 1
+
+
+def validator(*parts, last_modified=None):
+    """
+    Build a validator from the values a payload depends on.
+
+    Args:
+        parts: Anything whose repr identifies the payload version (ids, timestamps,
+            counts, query args)
+        last_modified: datetime (or POSIX seconds) of the newest row in the payload, if known
+
+    Returns:
+        dict: etag and last_modified (POSIX seconds), safe to store in the response cache
+    """
+    digest = hashlib.sha1(repr((ETAG_VERSION,) + parts).encode()).hexdigest()
+    if isinstance(last_modified, datetime):
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        last_modified = int(last_modified.timestamp())
+    return {'etag': digest, 'last_modified': last_modified}
+
+
+def _not_modified(etag, last_modified):
+    # If-None-Match wins over If-Modified-Since when both are sent (RFC 9110 13.2.2)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def conditional_response(current, build, policy):
+    """
+    Answer a GET with 304 when the client's copy is current, else build the payload.
+
+    Args:
+        current: Result of validator(), or None to skip validation
+        build: Callable returning the response (anything make_response accepts)
+        policy: Key of CACHE_POLICIES
+
+    Returns:
+        Response with ETag, Last-Modified and Cache-Control set
+    """
+    etag = current['etag'] if current else None
+    last_modified = None
+    if current and current['last_modified'] is not None:
+        last_modified = datetime.fromtimestamp(current['last_modified'], tz=timezone.utc)
+
+    if etag and _not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = current_app.make_response(build())
+        if response.status_code != 200:
+            return response
+
+    response.headers['Cache-Control'] = CACHE_POLICIES[policy]
+    if etag:
+        # Weak: the body may be re-encoded (e.g. compressed) without changing meaning
+        response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+
+def apply_default_policy(response):
+    """after_request hook: API responses without a policy must not be shared by caches"""
+    if request.path.startswith('/api/') and 'Cache-Control' not in response.headers:
+        response.headers['Cache-Control'] = PRIVATE_POLICY
+    return response
@@ -0,0 +1,82 @@
+"""
+Request-scoped identity
+Resolves the session's user at most once per request (memoized on flask.g),
+backed by a short-TTL process cache of user ids already verified to exist,
+so most requests don't need a users lookup at all
+"""
+
+from flask import g, session
+from backend.utils.cache import LRUCache
+
+# How long a verified session user id is trusted without re-checking the database
+VERIFIED_USER_TTL = 60
+
+_verified_user_ids = LRUCache(max_entries=4096)
+
+
+def get_current_user():
+    """
+    Get the logged in User, loading it at most once per request.
+
+    Clears the session login if the user no longer exists.
+
+    Returns:
+        User or None
+    """
+    if 'identity_user' in g:
+        return g.identity_user
+
+    from backend.models.user import User
+
+    user = None
+    user_id = session.get('user_id')
+    if user_id:
+        user = User.query.get(user_id)
+        if user:
+            _verified_user_ids.set(user_id, True, VERIFIED_USER_TTL)
+        else:
+            # User doesn't exist, clear the session
+            session.pop('user_id', None)
+            _verified_user_ids.delete(user_id)
+
+    g.identity_user = user
+    g.identity_user_id = user.id if user else None
+    return user
+
+
+def get_current_user_id():
+    """
+    Get the logged in user's id, verifying the user exists.
+
+    Ids verified within VERIFIED_USER_TTL seconds are trusted without a query.
+
+    Returns:
+        int or None
+    """
+    if 'identity_user_id' in g:
+        return g.identity_user_id
+
+    user_id = session.get('user_id')
+    if user_id and not _verified_user_ids.get(user_id):
+        user = get_current_user()
+        return user.id if user else None
+
+    g.identity_user_id = user_id
+    return user_id
+
+
+def login_user(user):
+    """Store user in the session and as this request's identity"""
+    session['user_id'] = user.id
+    _verified_user_ids.set(user.id, True, VERIFIED_USER_TTL)
+    g.identity_user = user
+    g.identity_user_id = user.id
+
+
+def logout_user():
+    """Clear the session login and this request's identity"""
+    user_id = session.pop('user_id', None)
+    if user_id:
+        _verified_user_ids.delete(user_id)
+    g.identity_user = None
+    g.identity_user_id = None
@@ -0,0 +1,263 @@
+"""
+Image pipeline
+Downloads (or reads) original product images and merchant logos, and stores
+size-specific WebP variants under frontend/static/media, named by a hash of
+the original's content. Identical images are processed once, and variant URLs
+never change for a given original, so they can be cached forever.
+"""
+
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from werkzeug.utils import safe_join
+
+try:
+    from PIL import Image, ImageOps
+    HAS_PILLOW = True
+except ImportError:
+    HAS_PILLOW = False
+
+_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+STATIC_DIR = os.path.join(_BASE_DIR, 'frontend', 'static')
+
+# Where variants are written and the URL prefix they are served from
+MEDIA_ROOT = os.getenv('MEDIA_ROOT', os.path.join(STATIC_DIR, 'media'))
+MEDIA_URL = os.getenv('MEDIA_URL', '/static/media')
+
+# name: (width, height, mode) - 'cover' crops to exactly the box, 'contain' fits inside it
+VARIANTS = {
+    'card': (400, 400, 'cover'),
+    'detail': (800, 800, 'contain'),
+    'zoom': (1600, 1600, 'contain'),
+}
+
+WEBP_QUALITY = 80
+
+# Originals larger than this are rejected rather than read or decoded
+MAX_ORIGINAL_BYTES = 10 * 1024 * 1024
+
+# Download chunk size; a download stops as soon as it passes MAX_ORIGINAL_BYTES
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
+
+def variant_url(content_hash, variant):
+    """Public URL of one variant of a processed image"""
+    return f"{MEDIA_URL}/{content_hash[:2]}/{content_hash}-{variant}.webp"
+
+
+def variant_urls(content_hash):
+    """URLs of every variant of a processed image, or None if it isn't processed"""
+    if not content_hash:
+        return None
+    return {variant: variant_url(content_hash, variant) for variant in VARIANTS}
+
+
+def _variant_path(content_hash, variant):
+    return os.path.join(MEDIA_ROOT, content_hash[:2], f"{content_hash}-{variant}.webp")
+
+
+def _static_path(source):
+    """Path of a local original, which must be a file inside the static folder"""
+    if source.startswith('/static/'):
+        relative = source[len('/static/'):]
+    else:
+        relative = os.path.relpath(os.path.abspath(source), STATIC_DIR)
+    # safe_join rejects absolute paths and '..' segments that would leave STATIC_DIR
+    path = safe_join(STATIC_DIR, relative)
+    if path is None or not os.path.isfile(path):
+        raise ValueError(f"Local images must be files under {STATIC_DIR}: {source}")
+    return path
+
+
+def _download(source, http_get):
+    """Stream a download, giving up once it passes MAX_ORIGINAL_BYTES"""
+    response = http_get(source, timeout=20, stream=True)
+    try:
+        response.raise_for_status()
+        length = response.headers.get('Content-Length')
+        if length and length.isdigit() and int(length) > MAX_ORIGINAL_BYTES:
+            raise ValueError(f"Image is larger than {MAX_ORIGINAL_BYTES} bytes")
+
+        data = bytearray()
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_BYTES):
+            data += chunk
+            if len(data) > MAX_ORIGINAL_BYTES:
+                raise ValueError(f"Image is larger than {MAX_ORIGINAL_BYTES} bytes")
+        return bytes(data)
+    finally:
+        response.close()
+
+
+def load_original(source, http_get=None):
+    """
+    Read an original image.
+
+    Args:
+        source: http(s) URL, or a /static/... URL or path of a file in the static folder
+        http_get: Function used for downloads (default: requests.get); called with stream=True
+
+    Returns:
+        bytes: Image file contents
+
+    Raises:
+        ValueError: A local path outside the static folder, or an original over MAX_ORIGINAL_BYTES
+    """
+    if urlparse(source).scheme in ('http', 'https'):
+        if http_get is None:
+            import requests
+            http_get = requests.get
+        return _download(source, http_get)
+
+    with open(_static_path(source), 'rb') as f:
+        data = f.read(MAX_ORIGINAL_BYTES + 1)
+    if len(data) > MAX_ORIGINAL_BYTES:
+        raise ValueError(f"Image is larger than {MAX_ORIGINAL_BYTES} bytes")
+    return data
+
+
+def process_image(data, force=False):
+    """
+    Generate every variant of an image.
+
+    Args:
+        data: Original image bytes
+        force: Regenerate variants even if they already exist
+
+    Returns:
+        str: Content hash identifying the variants (see variant_urls)
+
+    Raises:
+        ValueError: The original is over MAX_ORIGINAL_BYTES or Image.MAX_IMAGE_PIXELS
+    """
+    if not HAS_PILLOW:
+        raise RuntimeError("The image pipeline requires the 'Pillow' package")
+    if len(data) > MAX_ORIGINAL_BYTES:
+        raise ValueError(f"Image is larger than {MAX_ORIGINAL_BYTES} bytes")
+
+    content_hash = hashlib.sha256(data).hexdigest()[:32]
+    if not force and all(os.path.exists(_variant_path(content_hash, variant)) for variant in VARIANTS):
+        return content_hash
+
+    with Image.open(io.BytesIO(data)) as original:
+        # open() only reads the header; refuse decompression bombs before decoding.
+        # Pillow itself only errors at twice this bound.
+        if Image.MAX_IMAGE_PIXELS and original.width * original.height > Image.MAX_IMAGE_PIXELS:
+            raise ValueError(
+                f"Image is {original.width}x{original.height}, over {Image.MAX_IMAGE_PIXELS} pixels"
+            )
+        original = ImageOps.exif_transpose(original)
+        original = original.convert('RGBA' if original.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+        os.makedirs(os.path.dirname(_variant_path(content_hash, 'card')), exist_ok=True)
+        for variant, (width, height, mode) in VARIANTS.items():
+            if mode == 'cover':
+                image = ImageOps.fit(original, (width, height), Image.LANCZOS)
+            else:
+                image = original.copy()
+                # thumbnail() only shrinks, so small originals keep their size
+                image.thumbnail((width, height), Image.LANCZOS)
+
+            # Write to a temp file and rename, so readers never see a partial file
+            path = _variant_path(content_hash, variant)
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            image.save(temp_path, 'WEBP', quality=WEBP_QUALITY, method=4)
+            os.replace(temp_path, path)
+
+    return content_hash
+
+
+def ingest_image(source, http_get=None, force=False):
+    """Load an original and process it; returns its content hash"""
+    return process_image(load_original(source, http_get), force=force)
+
+
+def _process_rows(model, id_column, url_column, hash_column, workers, batch_size, force, limit):
+    """Process a backlog of (id, url) rows and store the hashes in batches"""
+    from sqlalchemy import update
+    from backend.app import db
+    from backend.utils.image_search import ImageFetcher
+
+    query = db.session.query(id_column, url_column).filter(url_column.isnot(None), url_column != '')
+    if not force:
+        query = query.filter(hash_column.is_(None))
+    if limit:
+        query = query.limit(limit)
+    rows = query.all()
+    db.session.commit()
+    if not rows:
+        return {'processed': 0, 'failed': 0}
+
+    print(f"🖼️  Processing {len(rows)} images with {workers} workers...")
+
+    # Rate-limited, retrying, pooled downloads shared with the image search
+    fetcher = ImageFetcher(workers=workers, rate=10.0, burst=workers)
+
+    def work(row):
+        row_id, url = row
+        try:
+            return row_id, ingest_image(url, http_get=fetcher.get, force=force)
+        except Exception as e:
+            print(f"  ✗ Could not process image for {model.__tablename__} {row_id}: {e}")
+            return row_id, None
+
+    processed = failed = 0
+    pending = []
+
+    def flush():
+        if pending:
+            db.session.execute(update(model), pending)
+            db.session.commit()
+            pending.clear()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='image-pipeline') as pool:
+        for row_id, content_hash in pool.map(work, rows):
+            if content_hash is None:
+                failed += 1
+                continue
+            pending.append({'id': row_id, hash_column.key: content_hash})
+            processed += 1
+            if len(pending) >= batch_size:
+                flush()
+                print(f"   … {processed + failed}/{len(rows)}")
+        flush()
+
+    return {'processed': processed, 'failed': failed}
+
+
+def process_product_images(workers=4, batch_size=100, force=False, limit=None):
+    """
+    Generate variants for products whose image hasn't been processed yet.
+
+    Args:
+        workers: Images downloaded and resized concurrently
+        batch_size: Products updated per commit
+        force: Reprocess every product with an image
+        limit: Process at most this many products
+
+    Returns:
+        dict: processed and failed counts
+    """
+    from backend.models.product import Product
+    from backend.utils.cache import invalidate_products
+
+    stats = _process_rows(Product, Product.id, Product.image_url, Product.image_hash,
+                          workers, batch_size, force, limit)
+    if stats['processed']:
+        invalidate_products()
+    return stats
+
+
+def process_merchant_logos(workers=4, batch_size=100, force=False, limit=None):
+    """Generate variants for merchant logos that haven't been processed yet"""
+    from backend.models.merchant import MerchantProfile
+    from backend.utils.cache import cache, PRODUCT_LISTING_NAMESPACE
+
+    stats = _process_rows(MerchantProfile, MerchantProfile.id, MerchantProfile.logo_url,
+                          MerchantProfile.logo_hash, workers, batch_size, force, limit)
+    if stats['processed']:
+        # Storefront summaries embed the logo URLs
+        cache.invalidate(PRODUCT_LISTING_NAMESPACE)
+    return stats
@@ -2,16 +2,34 @@
 Utility to fetch product images from Google Image Search
 """
 
+import os
+import random
+import threading
 import time
-from urllib.parse import quote
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import lru_cache
+from urllib.parse import quote, urlparse
+from backend.utils.lookup_cache import MISS, lookup_cache
 
 try:
     import requests
+    from requests.adapters import HTTPAdapter
     HAS_REQUESTS = True
 except ImportError:
     HAS_REQUESTS = False
 
-def get_google_image_url(product_name, api_key=None, search_engine_id=None):
+# Upstream endpoints; overridable so the fetcher can run against a local stub server
+GOOGLE_API_URL = os.getenv('GOOGLE_SEARCH_API_URL', 'https://www.googleapis.com/customsearch/v1')
+GOOGLE_IMAGES_URL = os.getenv('GOOGLE_IMAGES_URL', 'https://www.google.com/search')
+
+# Lookup cache namespaces for upstream results (found URL, or None for "no image")
+API_LOOKUP_NAMESPACE = 'image:google_api'
+SCRAPE_LOOKUP_NAMESPACE = 'image:google_scrape'
+
+# Responses worth retrying (rate limited or transient upstream failure)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def get_google_image_url(product_name, api_key=None, search_engine_id=None, http_get=None):
     """
     Get the first image URL from Google Image Search for a product name.
     
@@ -19,22 +37,30 @@ def get_google_image_url(product_name, api_key=None, search_engine_id=None):
         product_name: Name of the product to search for
         api_key: Google Custom Search API key (optional)
         search_engine_id: Google Custom Search Engine ID (optional)
+        http_get: Function used for HTTP GETs (default: requests.get); the
+            concurrent fetcher passes its rate-limited, retrying client
     
     Returns:
         str: URL of the first image result, or None if not found
     """
     if api_key and search_engine_id:
-        return _get_image_via_api(product_name, api_key, search_engine_id)
+        return _get_image_via_api(product_name, api_key, search_engine_id, http_get)
     else:
-        return _get_image_via_scraping(product_name)
+        return _get_image_via_scraping(product_name, http_get)
 
-def _get_image_via_api(product_name, api_key, search_engine_id):
+def _get_image_via_api(product_name, api_key, search_engine_id, http_get=None):
     """Get image using Google Custom Search API"""
     if not HAS_REQUESTS:
         return None
     
+    cache_key = f"{search_engine_id}:{product_name}"
+    cached = lookup_cache.get(API_LOOKUP_NAMESPACE, cache_key)
+    if cached is not MISS:
+        return cached
+    
+    http_get = http_get or requests.get
     try:
-        url = "https://www.googleapis.com/customsearch/v1"
+        url = GOOGLE_API_URL
         params = {
             'key': api_key,
             'cx': search_engine_id,
@@ -44,18 +70,23 @@ def _get_image_via_api(product_name, api_key, search_engine_id):
             'safe': 'active'
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = http_get(url, params=params, timeout=10)
         response.raise_for_status()
         
         data = response.json()
+        image_url = None
         if 'items' in data and len(data['items']) > 0:
-            return data['items'][0]['link']
+            image_url = data['items'][0]['link']
+        # Cache misses too, so names with no result don't burn quota on every run;
+        # errors (above) are not cached
+        lookup_cache.set(API_LOOKUP_NAMESPACE, cache_key, image_url)
+        return image_url
     except Exception as e:
         print(f"Error fetching image via API for '{product_name}': {e}")
     
     return None
 
-def _get_image_via_scraping(product_name):
+def _get_image_via_scraping(product_name, http_get=None):
     """Get image by scraping Google Images (fallback method)"""
     if not HAS_REQUESTS:
         # If requests is not available, use generated image URLs
@@ -63,7 +94,7 @@ def _get_image_via_scraping(product_name):
     
     try:
         # Method 1: Try Google Images via direct search
-        google_image = _scrape_google_images(product_name)
+        google_image = _scrape_google_images(product_name, http_get)
         if google_image:
             return google_image
         
@@ -79,20 +110,25 @@ def _get_image_via_scraping(product_name):
     
     return None
 
-def _scrape_google_images(product_name):
+def _scrape_google_images(product_name, http_get=None):
     """Scrape Google Images search results"""
     if not HAS_REQUESTS:
         return None
     
+    cached = lookup_cache.get(SCRAPE_LOOKUP_NAMESPACE, product_name)
+    if cached is not MISS:
+        return cached
+    
+    http_get = http_get or requests.get
     try:
         # Google Images search URL
-        search_url = f"https://www.google.com/search?q={quote(product_name)}&tbm=isch"
+        search_url = f"{GOOGLE_IMAGES_URL}?q={quote(product_name)}&tbm=isch"
         
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         
-        response = requests.get(search_url, headers=headers, timeout=10)
+        response = http_get(search_url, headers=headers, timeout=10)
         response.raise_for_status()
         
         # Parse the HTML to find image URLs
@@ -103,24 +139,30 @@ def _scrape_google_images(product_name):
         pattern = r'"ou":"([^"]+)"'  # Pattern to find original image URLs
         matches = re.findall(pattern, response.text)
         
+        result = None
         if matches:
             # Return the first valid image URL
             image_url = matches[0].replace('\\u003d', '=').replace('\\u0026', '&')
             # Verify it's a valid image URL
             if image_url.startswith('http') and any(ext in image_url.lower() for ext in ['.jpg', '.jpeg', '.png', '.webp', '.gif']):
-                return image_url
+                result = image_url
         
-        # Alternative: Look for the JSON data Google embeds
-        pattern2 = r'AF_initDataCallback.*?"(https://[^"]+\.(jpg|jpeg|png|webp))"'
-        matches2 = re.findall(pattern2, response.text, re.IGNORECASE)
-        if matches2:
-            return matches2[0][0]
+        if result is None:
+            # Alternative: Look for the JSON data Google embeds
+            pattern2 = r'AF_initDataCallback.*?"(https://[^"]+\.(jpg|jpeg|png|webp))"'
+            matches2 = re.findall(pattern2, response.text, re.IGNORECASE)
+            if matches2:
+                result = matches2[0][0]
+        
+        lookup_cache.set(SCRAPE_LOOKUP_NAMESPACE, product_name, result)
+        return result
             
     except Exception as e:
         print(f"Error scraping Google Images for '{product_name}': {e}")
     
     return None
 
+@lru_cache(maxsize=8192)
 def _get_image_from_unsplash(product_name):
     """Get product image from Unsplash API (free alternative)"""
     try:
@@ -147,7 +189,178 @@ def _get_image_from_pexels(product_name):
     # For now, we'll use Unsplash as it doesn't require a key
     pass
 
-def fetch_images_for_products(products, api_key=None, search_engine_id=None, delay=0.5):
+class TokenBucket:
+    """Thread-safe token bucket: refills at rate tokens/second up to capacity"""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_seconds = (1 - self._tokens) / self.rate
+            time.sleep(wait_seconds)
+
+
+class HostRateLimiter:
+    """One TokenBucket per upstream host, shared by every worker thread"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        bucket.acquire()
+
+
+class ImageFetcher:
+    """
+    Looks up product images concurrently.
+
+    Worker threads share a per-host rate limiter; each thread keeps its own
+    pooled requests.Session. Rate-limited (429) and transient 5xx responses
+    and connection errors are retried with exponential backoff and jitter,
+    honoring Retry-After when the upstream sends it.
+    """
+
+    def __init__(self, api_key=None, search_engine_id=None, workers=8, rate=2.0, burst=2,
+                 retries=3, backoff=0.5):
+        if not HAS_REQUESTS:
+            raise RuntimeError("ImageFetcher requires the 'requests' package")
+        self.api_key = api_key
+        self.search_engine_id = search_engine_id
+        self.workers = max(workers, 1)
+        self.limiter = HostRateLimiter(rate, burst)
+        self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=4)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            self._local.session = session
+        return session
+
+    def get(self, url, **kwargs):
+        """Rate-limited GET with retries; same interface as requests.get"""
+        attempt = 0
+        while True:
+            self.limiter.acquire(url)
+            try:
+                response = self._session().get(url, **kwargs)
+            except requests.RequestException:
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= self.retries:
+                    return response
+                # Release the pooled connection of a streamed response before retrying
+                response.close()
+                delay = self.backoff * (2 ** attempt)
+                retry_after = response.headers.get('Retry-After')
+                if retry_after and retry_after.isdigit():
+                    delay = max(delay, int(retry_after))
+            attempt += 1
+            time.sleep(delay * (1 + random.random() * 0.25))
+
+    def lookup(self, product_name):
+        """Image URL for one product name, falling back to a generated image"""
+        image_url = get_google_image_url(product_name, self.api_key, self.search_engine_id, http_get=self.get)
+        return image_url or _get_image_from_unsplash(product_name) or "https://via.placeholder.com/400"
+
+    def fetch(self, product_names):
+        """
+        Look up images for a stream of product names.
+
+        At most a few lookups per worker are in flight at once, so the input
+        can be an arbitrarily long generator.
+
+        Yields:
+            tuple: (product_name, image_url) in completion order
+        """
+        max_in_flight = self.workers * 4
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='image-fetch') as pool:
+            in_flight = {}
+            for product_name in product_names:
+                in_flight[pool.submit(self.lookup, product_name)] = product_name
+                if len(in_flight) >= max_in_flight:
+                    yield from self._drain(in_flight)
+            while in_flight:
+                yield from self._drain(in_flight)
+
+    @staticmethod
+    def _drain(in_flight):
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            product_name = in_flight.pop(future)
+            try:
+                yield product_name, future.result()
+            except Exception as e:
+                print(f"  ✗ Image lookup failed for '{product_name}': {e}")
+                yield product_name, _get_image_from_unsplash(product_name) or "https://via.placeholder.com/400"
+
+
+def _product_name(product):
+    if isinstance(product, dict):
+        return product.get('name', '')
+    return getattr(product, 'name', '')
+
+def iter_product_images(products, api_key=None, search_engine_id=None, workers=8, rate=2.0, **fetcher_options):
+    """
+    Stream image lookups for products as they complete.
+    
+    Args:
+        products: Iterable of product dictionaries or objects with a 'name' attribute
+        api_key: Google Custom Search API key (optional)
+        search_engine_id: Google Custom Search Engine ID (optional)
+        workers: Concurrent lookups
+        rate: Requests per second allowed to each upstream host
+        **fetcher_options: burst, retries, backoff (see ImageFetcher)
+    
+    Yields:
+        tuple: (product_name, image_url); each distinct name is looked up once
+    """
+    def unique_names():
+        seen = set()
+        for product in products:
+            product_name = _product_name(product)
+            if product_name and product_name not in seen:
+                seen.add(product_name)
+                yield product_name
+
+    if not HAS_REQUESTS:
+        # No HTTP client available: generated images only
+        for product_name in unique_names():
+            yield product_name, _get_image_from_unsplash(product_name)
+        return
+
+    fetcher = ImageFetcher(api_key, search_engine_id, workers=workers, rate=rate, **fetcher_options)
+    yield from fetcher.fetch(unique_names())
+
+def fetch_images_for_products(products, api_key=None, search_engine_id=None, delay=0.5, workers=8):
     """
     Fetch images for a list of products.
     
@@ -155,37 +368,20 @@ def fetch_images_for_products(products, api_key=None, search_engine_id=None, del
         products: List of product dictionaries or Product objects with 'name' attribute
         api_key: Google Custom Search API key (optional)
         search_engine_id: Google Custom Search Engine ID (optional)
-        delay: Delay between requests in seconds (to avoid rate limiting)
+        delay: Minimum seconds between requests to the same upstream host
+            (to avoid rate limiting)
+        workers: Concurrent lookups
     
     Returns:
         dict: Mapping of product names to image URLs
     """
-    image_urls = {}
+    rate = 1.0 / delay if delay > 0 else 1000.0
     
-    for product in products:
-        # Get product name
-        if isinstance(product, dict):
-            product_name = product.get('name', '')
-        else:
-            product_name = getattr(product, 'name', '')
-        
-        if not product_name:
-            continue
-        
-        print(f"Fetching image for: {product_name}...")
-        image_url = get_google_image_url(product_name, api_key, search_engine_id)
-        
-        if image_url:
-            image_urls[product_name] = image_url
-            print(f"  ✓ Found image: {image_url[:80]}...")
-        else:
-            print(f"  ✗ No image found, using generated image")
-            # Use a generated image URL as fallback
-            image_urls[product_name] = _get_image_from_unsplash(product_name) or "https://via.placeholder.com/400"
-        
-        # Delay to avoid rate limiting
-        if delay > 0:
-            time.sleep(delay)
+    image_urls = {}
+    for product_name, image_url in iter_product_images(
+        products, api_key, search_engine_id, workers=workers, rate=rate, burst=1
+    ):
+        image_urls[product_name] = image_url
+        print(f"  ✓ {product_name}: {image_url[:80]}")
     
     return image_urls
-
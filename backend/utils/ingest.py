@@ -0,0 +1,186 @@
+"""
+Bulk product ingestion
+Streams supplier records into the products table in fixed-size chunks: each
+chunk is COPYed into a temporary staging table and merged with a single
+INSERT ... SELECT ... ON CONFLICT (aliexpress_id), instead of a lookup query
+plus an ORM add() per product
+"""
+
+import time
+from datetime import datetime
+from itertools import islice
+from sqlalchemy import case, column, literal_column, select, table, text
+from sqlalchemy.dialects.postgresql import insert
+from backend.app import db
+from backend.models.product import Product
+from backend.utils.cache import invalidate_products
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Columns written by the ingest, in COPY order
+INGEST_COLUMNS = (
+    'name', 'description', 'price', 'stock', 'category', 'image_url',
+    'rating', 'review_count', 'shipping_time', 'shipping_cost',
+    'aliexpress_id', 'created_at', 'updated_at',
+)
+
+# Session-local staging table; ON COMMIT DELETE ROWS empties it after every chunk
+STAGING_TABLE = 'product_ingest'
+_staging = table(STAGING_TABLE, *[column(name) for name in INGEST_COLUMNS])
+
+# Columns refreshed from the feed when update_existing is set
+UPDATABLE_COLUMNS = (
+    'name', 'description', 'price', 'stock', 'category', 'image_url',
+    'rating', 'review_count', 'shipping_time', 'shipping_cost',
+)
+
+
+def product_row(data):
+    """
+    Map one supplier record to a products row, applying the same defaults
+    as the ORM path.
+
+    Returns:
+        dict or None: Row values, or None if the record lacks a name or price
+    """
+    if not data.get('name') or data.get('price') is None:
+        return None
+
+    now = datetime.utcnow()
+    return {
+        'name': data['name'],
+        'description': data.get('description', ''),
+        'price': data['price'],
+        'stock': data.get('stock', 100),
+        'category': data.get('category', 'Uncategorized'),
+        'image_url': data.get('image_url'),
+        'rating': data.get('rating', 0.0),
+        'review_count': data.get('review_count', 0),
+        'shipping_time': data.get('shipping_time', '15-30 days'),
+        'shipping_cost': data.get('shipping_cost', 0.0),
+        'aliexpress_id': data.get('aliexpress_id'),
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def chunked(iterable, size):
+    """Yield lists of up to size items from any iterable without materializing it"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _upsert_statement(update_existing):
+    products = Product.__table__
+    statement = insert(products).from_select(
+        list(INGEST_COLUMNS),
+        select(*[_staging.c[name] for name in INGEST_COLUMNS])
+    )
+    if update_existing:
+        statement = statement.on_conflict_do_update(
+            index_elements=[products.c.aliexpress_id],
+            set_={
+                **{name: statement.excluded[name] for name in UPDATABLE_COLUMNS},
+                'updated_at': statement.excluded.updated_at,
+                # Keep processed image variants only while the image is unchanged
+                'image_hash': case(
+                    (products.c.image_url == statement.excluded.image_url, products.c.image_hash),
+                    else_=None
+                ),
+            }
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(index_elements=[products.c.aliexpress_id])
+    # xmax is 0 only for freshly inserted tuples, which separates inserts from updates
+    return statement.returning(products.c.id, literal_column('xmax = 0').label('inserted'))
+
+
+def _copy_to_staging(rows):
+    """COPY rows into the staging table over the session's psycopg connection"""
+    connection = db.session.connection()
+    connection.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS {STAGING_TABLE} ON COMMIT DELETE ROWS AS "
+        f"SELECT {', '.join(INGEST_COLUMNS)} FROM products WITH NO DATA"
+    ))
+
+    cursor = connection.connection.driver_connection.cursor()
+    with cursor.copy(f"COPY {STAGING_TABLE} ({', '.join(INGEST_COLUMNS)}) FROM STDIN") as copy:
+        for row in rows:
+            copy.write_row([row[name] for name in INGEST_COLUMNS])
+
+
+def ingest_products(records, chunk_size=DEFAULT_CHUNK_SIZE, update_existing=False, progress_every=10):
+    """
+    Insert (or upsert) a stream of supplier product records.
+
+    Each chunk is COPYed, merged and committed on its own, so
+    memory stays bounded and a failure only loses the current chunk. Facet
+    counts are rebuilt and the product caches invalidated once at the end,
+    since bulk Core inserts bypass the ORM events that normally maintain them.
+
+    Args:
+        records: Iterable (ideally a generator) of product dicts
+        chunk_size: Records per COPY/merge batch
+        update_existing: Refresh rows whose aliexpress_id already exists
+            instead of skipping them
+        progress_every: Print a progress line every this many chunks (0 = never)
+
+    Returns:
+        dict: processed, inserted, updated, skipped, invalid, chunks,
+        seconds and rows_per_second
+    """
+    from backend.models.facet import ProductFacet
+
+    stats = {
+        'processed': 0, 'inserted': 0, 'updated': 0, 'skipped': 0,
+        'invalid': 0, 'chunks': 0, 'seconds': 0.0, 'rows_per_second': 0.0,
+    }
+    statement = _upsert_statement(update_existing)
+    started = time.perf_counter()
+
+    for chunk in chunked(records, chunk_size):
+        rows = {}
+        for data in chunk:
+            row = product_row(data)
+            if row is None:
+                stats['invalid'] += 1
+                continue
+            # ON CONFLICT can't touch the same row twice in one statement: last record wins
+            key = row['aliexpress_id'] if row['aliexpress_id'] is not None else ('no-id', len(rows))
+            if key in rows:
+                stats['skipped'] += 1
+            rows[key] = row
+
+        if rows:
+            try:
+                _copy_to_staging(rows.values())
+                results = db.session.execute(statement).all()
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            inserted = sum(1 for result in results if result.inserted)
+            stats['inserted'] += inserted
+            stats['updated'] += len(results) - inserted
+            stats['skipped'] += len(rows) - len(results)
+
+        stats['processed'] += len(chunk)
+        stats['chunks'] += 1
+        if progress_every and stats['chunks'] % progress_every == 0:
+            elapsed = time.perf_counter() - started
+            print(f"   … {stats['processed']:,} records ({stats['processed'] / elapsed:,.0f}/s)")
+
+    if stats['inserted'] or stats['updated']:
+        ProductFacet.rebuild()
+        db.session.commit()
+        invalidate_products()
+
+    stats['seconds'] = round(time.perf_counter() - started, 3)
+    if stats['seconds']:
+        stats['rows_per_second'] = round(stats['processed'] / stats['seconds'], 1)
+    return stats
@@ -0,0 +1,104 @@
+"""
+JSON provider
+Flask JSON provider that encodes with orjson when it is installed and falls
+back to the standard library otherwise. Both paths encode Decimal as a number
+and date/datetime as ISO 8601 strings, so serializers can hand over column
+values without converting them first.
+"""
+
+import dataclasses
+import decimal
+import json
+import uuid
+from datetime import date, datetime, time
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+
+def _default(value):
+    """Encode the types json/orjson don't handle natively"""
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's default provider with ISO 8601 dates instead of HTTP dates"""
+
+    default = staticmethod(_default)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """
+    orjson-backed provider. Keeps Flask's behaviour: keys sorted (sort_keys),
+    indented output for pretty-printed debug responses, and the stdlib for
+    calls that pass json.dumps keyword arguments.
+    """
+
+    default = staticmethod(_default)
+
+    def _options(self, indent=False):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self._options(indent)) + b"\n",
+            mimetype=self.mimetype
+        )
+
+
+def provider_class(name=None):
+    """
+    Pick a provider by name: 'orjson', 'stdlib', or None/'auto' for orjson
+    when it is installed.
+    """
+    if name in (None, '', 'auto'):
+        return OrjsonProvider if HAS_ORJSON else StdlibJSONProvider
+    if name == 'orjson':
+        if not HAS_ORJSON:
+            raise RuntimeError("JSON_PROVIDER=orjson requires the 'orjson' package")
+        return OrjsonProvider
+    if name == 'stdlib':
+        return StdlibJSONProvider
+    raise ValueError(f"Unknown JSON provider '{name}'. Use one of: auto, orjson, stdlib")
+
+
+def dumps(obj):
+    """Encode obj outside a request (e.g. for the Redis cache); returns str"""
+    if HAS_ORJSON:
+        return orjson.dumps(obj, default=_default, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, default=_default)
+
+
+def loads(s):
+    return orjson.loads(s) if HAS_ORJSON else json.loads(s)
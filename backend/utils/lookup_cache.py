@@ -0,0 +1,123 @@
+"""
+Persistent lookup cache
+SQLite-backed key/value store with per-entry expiry for results of slow or
+quota-limited upstream lookups (e.g. product name -> image URL). It survives
+process restarts, so repeat runs of the image and populate scripts skip the
+network. Negative results ("no image found") are cached too, with a shorter TTL.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Default lifetimes: found results change rarely; misses are retried sooner
+DEFAULT_TTL = 30 * 24 * 3600
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+
+# Returned by get() when there is no live entry (None is a valid cached value)
+MISS = object()
+
+
+def default_cache_path():
+    """LOOKUP_CACHE_PATH, else .cache/lookups.sqlite3 in the project (/tmp on Vercel)"""
+    path = os.getenv('LOOKUP_CACHE_PATH')
+    if path:
+        return path
+    if os.getenv('VERCEL'):
+        return '/tmp/congo-lookups.sqlite3'
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../..'))
+    return os.path.join(base_dir, '.cache', 'lookups.sqlite3')
+
+
+class LookupCache:
+    """
+    Namespaced, persistent cache. Safe to share between threads: each thread
+    gets its own SQLite connection, and WAL mode lets readers and the writer
+    proceed concurrently. Storage errors are reported and treated as misses.
+    """
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        self.path = path or default_cache_path()
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.enabled = self.path.lower() != 'none'
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS lookups ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, expires_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace, key):
+        """
+        Look up a cached value.
+
+        Returns:
+            The cached value (possibly None for a cached negative result),
+            or MISS if there is no live entry
+        """
+        if not self.enabled:
+            return MISS
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM lookups WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"⚠️  Lookup cache error (get): {e}")
+            return MISS
+        if row is None or row[1] <= time.time():
+            return MISS
+        return json.loads(row[0]) if row[0] is not None else None
+
+    def set(self, namespace, key, value, ttl=None):
+        """Store a value; None records a negative result with the negative TTL"""
+        if not self.enabled:
+            return
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO lookups (namespace, key, value, expires_at) VALUES (?, ?, ?, ?)",
+                    (namespace, key, json.dumps(value) if value is not None else None, time.time() + ttl)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️  Lookup cache error (set): {e}")
+
+    def clear(self, namespace=None):
+        """Drop every entry, or every entry in one namespace"""
+        if not self.enabled:
+            return
+        conn = self._connection()
+        with conn:
+            if namespace is None:
+                conn.execute("DELETE FROM lookups")
+            else:
+                conn.execute("DELETE FROM lookups WHERE namespace = ?", (namespace,))
+
+    def purge_expired(self):
+        """Delete expired entries; returns how many were removed"""
+        if not self.enabled:
+            return 0
+        conn = self._connection()
+        with conn:
+            return conn.execute("DELETE FROM lookups WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+lookup_cache = LookupCache()
@@ -0,0 +1,105 @@
+"""
+Keyset (cursor) pagination helpers
+Pages are addressed by the (sort_key, id) of the last row seen instead of an
+OFFSET, so every page costs the same index range scan however deep it is
+"""
+
+import base64
+import json
+from sqlalchemy import text, tuple_
+from backend.app import db
+
+
+def encode_cursor(sort, value, last_id, search_mode=None):
+    """
+    Encode the position after a row as an opaque, URL-safe cursor.
+
+    Args:
+        sort: Name of the sort order the cursor belongs to
+        value: Sort key of the last row on the page (JSON-serializable)
+        last_id: Primary key of the last row on the page
+        search_mode: Kept in the cursor ('m') so later pages of a fuzzy search stay fuzzy
+
+    Returns:
+        str: Cursor token
+    """
+    position = {'s': sort, 'v': value, 'id': last_id}
+    if search_mode:
+        position['m'] = search_mode
+    payload = json.dumps(position, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Returns:
+        dict: {'s': sort, 'v': value, 'id': last_id}, plus 'm' (search mode) if set
+
+    Raises:
+        ValueError: If the token is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(data, dict) or not isinstance(data.get('id'), int):
+            raise ValueError('missing position')
+        return data
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {e}')
+
+
+def keyset_page(query, sort_expression, id_column, descending=False, after=None, per_page=20):
+    """
+    Fetch one page of a query ordered by (sort_expression, id_column).
+
+    Args:
+        query: Filtered query (any existing ORDER BY is replaced)
+        sort_expression: Column or expression to sort by
+        id_column: Unique tie-breaker column (primary key)
+        descending: Sort both keys descending
+        after: (sort_value, id) of the last row of the previous page, or None
+        per_page: Page size
+
+    Returns:
+        tuple: (items, has_more)
+    """
+    position = tuple_(sort_expression, id_column)
+    if after is not None:
+        bound = tuple_(*after)
+        query = query.filter(position < bound if descending else position > bound)
+
+    if descending:
+        query = query.order_by(None).order_by(sort_expression.desc(), id_column.desc())
+    else:
+        query = query.order_by(None).order_by(sort_expression.asc(), id_column.asc())
+
+    # One extra row tells us whether there is a next page without a COUNT
+    items = query.limit(per_page + 1).all()
+    return items[:per_page], len(items) > per_page
+
+
+def approximate_table_count(table_name):
+    """Row count estimate from planner statistics (pg_class.reltuples), no table scan"""
+    estimate = db.session.execute(
+        text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+        {'table_name': table_name}
+    ).scalar()
+    # reltuples is -1 for tables that have never been analyzed
+    if estimate is None or estimate < 0:
+        return None
+    return int(estimate)
+
+
+def estimate_query_count(query):
+    """Row count estimate for a filtered query, read from the planner's EXPLAIN output"""
+    # Compiled with bound parameters and sent as-is: literal binds wrapped in text()
+    # would double-escape '%' operators and parse ':word' in search terms as binds
+    compiled = query.order_by(None).statement.compile(dialect=db.engine.dialect)
+    plan = db.session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
@@ -0,0 +1,64 @@
+"""
+Field selection for API payloads
+Endpoints accept ?fields=a,b,c or ?profile=<name>. Each model describes its
+output fields as {name: (column expressions, serializer)}; only the columns
+behind the requested fields are selected, and rows are serialized straight
+from the result tuples without building ORM objects.
+"""
+
+
+def resolve_fields(args, fields, profiles, default_profile):
+    """
+    Work out which output fields a request asked for.
+
+    Args:
+        args: Request args (fields / profile)
+        fields: The model's field registry
+        profiles: {profile name: tuple of field names}
+        default_profile: Profile used when neither argument is given
+
+    Returns:
+        tuple: Field names in output order ('id' always included)
+
+    Raises:
+        ValueError: On an unknown field or profile
+    """
+    requested = args.get('fields')
+    profile = args.get('profile')
+
+    if requested:
+        names = [name.strip() for name in requested.split(',') if name.strip()]
+        unknown = [name for name in names if name not in fields]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Use any of: {', '.join(fields)}")
+        if 'id' not in names:
+            names.insert(0, 'id')
+        return tuple(dict.fromkeys(names))
+
+    profile = profile or default_profile
+    if profile not in profiles:
+        raise ValueError(f"Unknown profile '{profile}'. Use one of: {', '.join(profiles)}")
+    return profiles[profile]
+
+
+def select_columns(fields, names, extra=()):
+    """
+    Column expressions needed to serialize the given fields.
+
+    Args:
+        fields: The model's field registry
+        names: Field names to serialize
+        extra: Additional columns the caller needs (e.g. sort keys)
+
+    Returns:
+        list: Column expressions, each selected once
+    """
+    columns = {}
+    for expression in [expression for name in names for expression in fields[name][0]] + list(extra):
+        columns.setdefault(expression.key, expression)
+    return list(columns.values())
+
+
+def serialize(row, fields, names):
+    """Serialize a result row (or a model instance) to a dict of the given fields"""
+    return {name: fields[name][1](row) for name in names}
@@ -0,0 +1,69 @@
+"""
+Product search
+Full-text search over the weighted products.search_vector column (GIN indexed),
+with a pg_trgm word-similarity fallback so misspelled queries still find results
+"""
+
+import re
+from sqlalchemy import func
+from backend.models.product import Product
+
+SEARCH_CONFIG = 'english'
+
+_TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+def build_prefix_tsquery(term):
+    """
+    Build a tsquery string from free text.
+
+    Every word must match and the last word is treated as a prefix, so
+    results keep up with the user while they are still typing.
+
+    Args:
+        term: Raw search text from the request
+
+    Returns:
+        str: tsquery source (e.g. "wireless & head:*"), or None if there are no words
+    """
+    tokens = _TOKEN_PATTERN.findall(term or '')
+    if not tokens:
+        return None
+    tokens[-1] = f"{tokens[-1]}:*"
+    return ' & '.join(tokens)
+
+
+def apply_search(query, term, fuzzy=False):
+    """
+    Restrict and rank a Product query by a search term.
+
+    Full-text matches are ranked with ts_rank_cd. With fuzzy=True the query
+    uses trigram word similarity on the product name instead (catches typos
+    like "hedphones"); callers switch to it when the full-text search finds
+    nothing, so a search that hits costs no extra round trip.
+
+    Args:
+        query: Product query with any other filters already applied
+        term: Raw search text from the request
+        fuzzy: Match by trigram similarity instead of full-text
+
+    Returns:
+        tuple: (query, mode) where mode is 'fulltext', 'fuzzy' or None if the
+        term contained no searchable words
+    """
+    tsquery_source = build_prefix_tsquery(term)
+    if not tsquery_source:
+        return query, None
+
+    if not fuzzy:
+        tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_source)
+        rank = func.ts_rank_cd(Product.search_vector, tsquery)
+        fulltext_query = query.filter(Product.search_vector.op('@@')(tsquery))
+        return fulltext_query.order_by(rank.desc(), Product.id), 'fulltext'
+
+    # name %> term  <=>  word_similarity(term, name) above pg_trgm's threshold;
+    # served by ix_products_name_trgm
+    term = term.strip()
+    fuzzy_query = query.filter(Product.name.op('%>')(term))
+    similarity = func.word_similarity(term, Product.name)
+    return fuzzy_query.order_by(similarity.desc(), Product.id), 'fuzzy'
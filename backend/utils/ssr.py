@@ -0,0 +1,73 @@
+"""
+Server-side rendering helpers
+The page routes render the first page of products straight into the HTML,
+through the same listing query and response cache as /api/products/. Each
+product card is rendered once per (product id, updated_at) and reused from
+the fragment cache, so a page render mostly concatenates cached cards.
+"""
+
+from flask import render_template
+from markupsafe import Markup
+from werkzeug.datastructures import MultiDict
+from backend.models.product import PRODUCT_PROFILES
+from backend.utils.cache import cache, PRODUCT_LISTING_NAMESPACE
+
+# Rendered HTML fragments; keys carry updated_at, so entries never need invalidating
+FRAGMENT_NAMESPACE = 'fragment'
+FRAGMENT_TTL = 24 * 3600
+
+# Card fields plus updated_at for the fragment cache key
+CARD_FIELDS = PRODUCT_PROFILES['card'] + ('updated_at',)
+
+# Listing args the product pages understand
+LISTING_ARGS = ('category', 'search', 'local', 'page')
+
+
+def render_product_card(product, variant='grid'):
+    """
+    Render one product card, reusing the cached HTML while the product is unchanged.
+
+    Args:
+        product: Product payload with CARD_FIELDS
+        variant: 'grid' (products page) or 'featured' (home page)
+    """
+    updated_at = product['updated_at']
+    version = updated_at.isoformat() if hasattr(updated_at, 'isoformat') else updated_at
+    key = f"product-card:{variant}:{product['id']}:{version}"
+    html = cache.get_or_set(
+        FRAGMENT_NAMESPACE, key,
+        lambda: render_template('_product_card.html', product=product, variant=variant),
+        ttl=FRAGMENT_TTL
+    )
+    return Markup(html)
+
+
+def initial_listing(args, per_page):
+    """
+    First page of a product listing for server-side rendering.
+
+    Args:
+        args: Request args; only LISTING_ARGS are used
+        per_page: Page size, matching what the page's script requests
+
+    Returns:
+        dict: The list_products payload plus the args it was built for
+    """
+    from backend.api.products import listing_entry
+
+    listing_args = MultiDict({name: args[name] for name in LISTING_ARGS if args.get(name)})
+    listing_args['per_page'] = str(per_page)
+    listing_args['fields'] = ','.join(CARD_FIELDS)
+
+    # Same entry as GET /api/products/ with these args
+    key = cache.make_key('entry', args=listing_args)
+    payload = cache.get_or_set(PRODUCT_LISTING_NAMESPACE, key, lambda: listing_entry(listing_args))['payload']
+    return {
+        **payload,
+        'args': {
+            'category': listing_args.get('category', ''),
+            'search': listing_args.get('search', ''),
+            'local': listing_args.get('local', '').lower() == 'true',
+            'page': payload['page'],
+        },
+    }
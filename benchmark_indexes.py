@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Query plan benchmark for the hot-path indexes
+Seeds synthetic users, products, carts, orders, addresses and payment methods
+inside one transaction, then runs EXPLAIN ANALYZE for each hot lookup with its
+index dropped and with it present. Everything is rolled back at the end, so it
+is safe to point at a development database.
+
+Usage: python benchmark_indexes.py [--users 2000] [--products 50000]
+"""
+
+import argparse
+import json
+from sqlalchemy import text
+from backend.app import create_app, db
+
+# (label, index that serves it, query); bind params come from seed()
+HOT_QUERIES = [
+    (
+        'add_to_cart / login cart merge',
+        'uq_cart_items_user_product',
+        "SELECT * FROM cart_items WHERE user_id = :user_id AND product_id = :product_id",
+    ),
+    (
+        'get_orders',
+        'ix_orders_user_created',
+        "SELECT * FROM orders WHERE user_id = :user_id ORDER BY created_at DESC",
+    ),
+    (
+        'order items for a page of orders',
+        'ix_order_items_order_id',
+        "SELECT * FROM order_items WHERE order_id IN "
+        "(SELECT id FROM orders WHERE user_id = :user_id)",
+    ),
+    (
+        'products by category',
+        'ix_products_category',
+        "SELECT id, name, price FROM products WHERE category = :category ORDER BY id LIMIT 20",
+    ),
+    (
+        'merchant products',
+        'ix_products_merchant_id',
+        "SELECT id, name, price FROM products WHERE merchant_id = :merchant_id",
+    ),
+    (
+        'aliexpress dedup',
+        'uq_products_aliexpress_id',
+        "SELECT id FROM products WHERE aliexpress_id = :aliexpress_id",
+    ),
+    (
+        'default address',
+        'ix_addresses_user_default',
+        "SELECT * FROM addresses WHERE user_id = :user_id AND is_default = true",
+    ),
+    (
+        'default payment method',
+        'ix_payment_methods_user_default',
+        "SELECT * FROM payment_methods WHERE user_id = :user_id AND is_default = true",
+    ),
+]
+
+CATEGORIES = ['Electronics', 'Fashion', 'Home & Kitchen', 'Sports', 'Beauty',
+              'Toys', 'Books', 'Garden', 'Automotive', 'Pets']
+
+
+def seed(conn, users, products):
+    """Insert synthetic rows and return the parameters the hot queries use"""
+    user_ids = conn.execute(text("""
+        INSERT INTO users (username, password_hash, role, created_at)
+        SELECT 'bench_user_' || g, 'x', CASE WHEN g % 20 = 0 THEN 'merchant' ELSE 'shopper' END, now()
+        FROM generate_series(1, CAST(:users AS integer)) AS g
+        RETURNING id
+    """), {'users': users}).scalars().all()
+    user_low, user_high = min(user_ids), max(user_ids)
+
+    conn.execute(text("""
+        INSERT INTO products (name, description, price, stock, category, aliexpress_id, merchant_id, created_at)
+        SELECT 'Bench product ' || g, 'synthetic', (g % 500) + 0.99, 100,
+               (CAST(:categories AS text[]))[1 + g % :category_count],
+               'BENCH' || g,
+               CASE WHEN g % 4 = 0 THEN :user_low + 19 + (g % (:users / 20)) * 20 END,
+               now()
+        FROM generate_series(1, CAST(:products AS integer)) AS g
+    """), {'categories': CATEGORIES, 'category_count': len(CATEGORIES), 'products': products, 'users': users, 'user_low': user_low})
+
+    product_low, product_high = conn.execute(text(
+        "SELECT min(id), max(id) FROM products WHERE aliexpress_id LIKE 'BENCH%'"
+    )).one()
+
+    # ~5 cart items, ~10 orders of 3 items, 3 addresses and 2 cards per user
+    conn.execute(text("""
+        INSERT INTO cart_items (user_id, product_id, quantity, created_at)
+        SELECT u, :product_low + (u * 7 + k * 13) % (:product_high - :product_low + 1), 1, now()
+        FROM generate_series(CAST(:user_low AS integer), CAST(:user_high AS integer)) AS u, generate_series(1, 5) AS k
+    """), {'user_low': user_low, 'user_high': user_high,
+           'product_low': product_low, 'product_high': product_high})
+    conn.execute(text("""
+        INSERT INTO orders (user_id, total_amount, status, shipping_address, created_at)
+        SELECT u, 10, 'delivered', 'synthetic', now() - (k || ' days')::interval
+        FROM generate_series(CAST(:user_low AS integer), CAST(:user_high AS integer)) AS u, generate_series(1, 10) AS k
+    """), {'user_low': user_low, 'user_high': user_high})
+    conn.execute(text("""
+        INSERT INTO order_items (order_id, product_id, quantity, price)
+        SELECT o.id, :product_low + (o.id * 3 + k) % (:product_high - :product_low + 1), 1, 10
+        FROM orders o, generate_series(1, 3) AS k
+        WHERE o.user_id BETWEEN :user_low AND :user_high
+    """), {'user_low': user_low, 'user_high': user_high,
+           'product_low': product_low, 'product_high': product_high})
+    conn.execute(text("""
+        INSERT INTO addresses (user_id, name, address_line1, city, postal_code, country, is_default, created_at)
+        SELECT u, 'Bench', '1 Main St', 'Springfield', '00000', 'US', k = 1, now()
+        FROM generate_series(CAST(:user_low AS integer), CAST(:user_high AS integer)) AS u, generate_series(1, 3) AS k
+    """), {'user_low': user_low, 'user_high': user_high})
+    conn.execute(text("""
+        INSERT INTO payment_methods (user_id, card_type, last_four, cardholder_name, is_default, is_expired, created_at)
+        SELECT u, 'Visa', '4242', 'Bench', k = 1, false, now()
+        FROM generate_series(CAST(:user_low AS integer), CAST(:user_high AS integer)) AS u, generate_series(1, 2) AS k
+    """), {'user_low': user_low, 'user_high': user_high})
+
+    conn.execute(text("ANALYZE"))
+
+    user_id = (user_low + user_high) // 2
+    return {
+        'user_id': user_id,
+        'product_id': product_low + (user_id * 7 + 13) % (product_high - product_low + 1),
+        'category': CATEGORIES[3],
+        'merchant_id': user_low + 19,
+        'aliexpress_id': f'BENCH{products // 2}',
+    }
+
+
+def explain(conn, query, params):
+    """Run EXPLAIN ANALYZE and return (scan nodes of the plan, execution ms)"""
+    plan = conn.execute(text(f"EXPLAIN (ANALYZE, FORMAT JSON) {query}"), params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+
+    scans = []
+    stack = [root['Plan']]
+    while stack:
+        node = stack.pop()
+        if 'Relation Name' in node or 'Index Name' in node:
+            scans.append(f"{node['Node Type']}" + (f" using {node['Index Name']}" if 'Index Name' in node else ''))
+        stack.extend(node.get('Plans', []))
+
+    return ', '.join(scans), root['Execution Time']
+
+
+def run_benchmark(users, products):
+    app = create_app()
+
+    with app.app_context():
+        with db.engine.connect() as conn:
+            transaction = conn.begin()
+            try:
+                print(f"✓ Seeding {users} users and {products} products (rolled back afterwards)...")
+                params = seed(conn, users, products)
+
+                print()
+                print(f"{'query':<34} {'':<8} {'ms':>9}  plan")
+                for label, index_name, query in HOT_QUERIES:
+                    # Plan without the index: drop it inside a savepoint, then restore it
+                    savepoint = conn.begin_nested()
+                    conn.execute(text(f'DROP INDEX IF EXISTS "{index_name}"'))
+                    before_plan, before_ms = explain(conn, query, params)
+                    savepoint.rollback()
+
+                    after_plan, after_ms = explain(conn, query, params)
+
+                    print(f"{label:<34} {'before':<8} {before_ms:>9.3f}  {before_plan}")
+                    print(f"{'':<34} {'after':<8} {after_ms:>9.3f}  {after_plan}")
+            finally:
+                transaction.rollback()
+                print()
+                print("✓ Rolled back synthetic data")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare hot query plans with and without their indexes')
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--products', type=int, default=50000)
+    args = parser.parse_args()
+    run_benchmark(args.users, args.products)
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+JSON encoding benchmark for /api/products/ payloads
+Builds real listing payloads from the database, then compares the stdlib and
+orjson providers: encoding alone, and full cached GET /api/products/ requests
+(the listing cache is warmed first, so the request time is mostly routing plus
+encoding). Nothing is written to the database.
+
+Usage: python benchmark_json.py [--iterations 500] [--per-page 20 100]
+"""
+
+import argparse
+import time
+from werkzeug.datastructures import MultiDict
+from backend.app import create_app
+from backend.api.products import list_products
+from backend.utils.json_provider import HAS_ORJSON, OrjsonProvider, StdlibJSONProvider
+
+
+def best_of(fn, iterations, repeat=5):
+    """Best mean seconds per call over several timing rounds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        best = min(best, (time.perf_counter() - started) / iterations)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare JSON providers on product listing payloads')
+    parser.add_argument('--iterations', type=int, default=500, help='Calls per timing round')
+    parser.add_argument('--per-page', type=int, nargs='+', default=[20, 100], help='Listing sizes to test')
+    args = parser.parse_args()
+
+    if not HAS_ORJSON:
+        print("⚠️  orjson is not installed; only the stdlib provider can be measured (pip install orjson)")
+
+    app = create_app()
+    providers = [('stdlib', StdlibJSONProvider(app))]
+    if HAS_ORJSON:
+        providers.append(('orjson', OrjsonProvider(app)))
+
+    client = app.test_client()
+    print(f"{'payload':<22} {'provider':<8} {'bytes':>9} {'encode':>11} {'request':>11}")
+
+    for per_page in args.per_page:
+        for profile in ('detail', 'card'):
+            query = MultiDict({'per_page': str(per_page), 'profile': profile})
+            with app.app_context():
+                payload = list_products(query)
+            if not payload['products']:
+                print("❌ No products in the database; run populate_aliexpress.py first")
+                return
+
+            baseline = None
+            for name, provider in providers:
+                encoded = provider.dumps(payload)
+                if baseline is None:
+                    baseline = provider.loads(encoded)
+                elif provider.loads(encoded) != baseline:
+                    print(f"⚠️  {name} output differs from stdlib for {profile}/{per_page}")
+
+                encode_time = best_of(lambda: provider.dumps(payload), args.iterations)
+
+                app.json = provider
+                url = f"/api/products/?per_page={per_page}&profile={profile}"
+                client.get(url)  # warm the listing cache
+                request_time = best_of(lambda: client.get(url), max(args.iterations // 5, 1))
+
+                print(f"{profile + ' x' + str(len(payload['products'])):<22} {name:<8} {len(encoded.encode()):>9,} "
+                      f"{encode_time * 1e6:>9.1f}µs {request_time * 1e6:>9.1f}µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -35,14 +35,14 @@ function checkAuth() {
 function addToCart(productId, redirectToConfirmation = false) {
     const button = document.querySelector(`[data-product-id="${productId}"]`);
     
-    fetch('/api/cart/', {
+    // The batch endpoint answers with the updated cart, so the count needs no second request
+    fetch('/api/cart/batch?fields=id', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
         body: JSON.stringify({
-            product_id: productId,
-            quantity: 1
+            operations: [{ op: 'add', product_id: productId, quantity: 1 }]
         })
     })
     .then(response => {
@@ -53,17 +53,12 @@ function addToCart(productId, redirectToConfirmation = false) {
         }
         return response.json();
     })
-    .then(data => {
-        // Update cart count and wait for it to complete
-        return updateCartCount().then(() => data);
-    })
-    .then(data => {
+    .then(cart => {
+        renderCartCount(cart);
+        
         // If redirectToConfirmation is true (from product detail page), redirect to confirmation page
         if (redirectToConfirmation) {
-            // Small delay to ensure cart is fully updated in database
-            setTimeout(() => {
-                window.location.href = `/added-to-cart?product_id=${productId}`;
-            }, 100);
+            window.location.href = `/added-to-cart?product_id=${productId}`;
             return;
         }
         
@@ -83,54 +78,59 @@ function addToCart(productId, redirectToConfirmation = false) {
     });
 }
 
+// Latest cart summary request; pages that render buttons later reuse it instead of refetching
+let cartSummaryRequest = null;
+
 // Check cart status and update button states
 function updateCartButtonStates() {
-    fetch('/api/cart/')
-        .then(response => {
-            if (response.ok) {
-                return response.json();
-            }
-            return [];
-        })
-        .then(cart => {
-            updateCartButtonStatesFromCart(cart);
-        })
-        .catch(() => {
-            // Silently fail
-        });
+    (cartSummaryRequest || updateCartCount())
+        .then(summary => updateCartButtonStatesFromIds(summary.product_ids));
 }
 
 // Update cart count (works for both logged in and guest users)
 function updateCartCount() {
-    return fetch('/api/cart/')
+    cartSummaryRequest = fetch('/api/cart/summary')
         .then(response => {
             if (response.ok) {
                 return response.json();
             }
-            return [];
-        })
-        .then(cart => {
-            const count = cart.reduce((sum, item) => sum + (item.quantity || 0), 0);
-            const cartCountEl = document.getElementById('cart-count');
-            if (cartCountEl) {
-                cartCountEl.textContent = count;
-            }
-            // Also update button states
-            updateCartButtonStatesFromCart(cart);
-            return cart; // Return cart data for chaining
+            return { count: 0, subtotal: 0, product_ids: [] };
         })
+        .then(renderCartSummary)
         .catch(() => {
             const cartCountEl = document.getElementById('cart-count');
             if (cartCountEl) {
                 cartCountEl.textContent = '0';
             }
-            return []; // Return empty array on error
+            return { count: 0, subtotal: 0, product_ids: [] };
         });
+    return cartSummaryRequest;
+}
+
+// Show a cart summary ({count, subtotal, product_ids}, as GET /api/cart/summary returns it)
+function renderCartSummary(summary) {
+    const cartCountEl = document.getElementById('cart-count');
+    if (cartCountEl) {
+        cartCountEl.textContent = summary.count;
+    }
+    // Also update button states
+    updateCartButtonStatesFromIds(summary.product_ids);
+    return summary; // Return summary for chaining
+}
+
+// Show the item count of a full cart payload (GET /api/cart/ or POST /api/cart/batch)
+function renderCartCount(cart) {
+    const summary = {
+        count: cart.reduce((sum, item) => sum + (item.quantity || 0), 0),
+        product_ids: cart.map(item => item.product_id)
+    };
+    cartSummaryRequest = Promise.resolve(summary);
+    renderCartSummary(summary);
+    return cart; // Return cart data for chaining
 }
 
-// Update button states from cart data
-function updateCartButtonStatesFromCart(cart) {
-    const productIds = cart.map(item => item.product_id);
+// Update button states for the products in the cart
+function updateCartButtonStatesFromIds(productIds) {
     // Update all buttons for products in cart
     productIds.forEach(productId => {
         const element = document.querySelector(`[data-product-id="${productId}"]`);
@@ -557,8 +557,8 @@ function loadHeaderCategories() {
 // Initialize on page load
 document.addEventListener('DOMContentLoaded', () => {
     checkAuth();
+    // One summary request updates the badge and the "In cart" buttons
     updateCartCount();
-    updateCartButtonStates();
     loadDeliveryLocation();
     loadHeaderCategories();
     
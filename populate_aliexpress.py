@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
 Script to populate database with products from AliExpress
-Usage: python populate_aliexpress.py [--count 100] [--api-key YOUR_API_KEY]
+Usage: python populate_aliexpress.py [--count 100] [--api-key YOUR_API_KEY] [--chunk-size 1000] [--update-existing]
 """
 
 import argparse
@@ -12,11 +12,14 @@ import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from backend.utils.aliexpress import populate_products_from_aliexpress
+from backend.utils.ingest import DEFAULT_CHUNK_SIZE
 
 def main():
     parser = argparse.ArgumentParser(description='Populate database with AliExpress products')
     parser.add_argument('--count', type=int, default=100, help='Number of products to fetch (default: 100)')
     parser.add_argument('--api-key', type=str, default=None, help='AliExpress API key (optional, uses mock data if not provided)')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help=f'Records per COPY batch (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--update-existing', action='store_true', help='Refresh products that already exist instead of skipping them')
     
     args = parser.parse_args()
     
@@ -30,7 +33,12 @@ def main():
         print("")
     
     try:
-        count = populate_products_from_aliexpress(args.api_key, args.count)
+        count = populate_products_from_aliexpress(
+            args.api_key,
+            args.count,
+            chunk_size=args.chunk_size,
+            update_existing=args.update_existing
+        )
         print(f"\n✅ Successfully populated {count} products!")
     except Exception as e:
         print(f"\n❌ Error: {e}")
@@ -116,6 +116,7 @@ def ensure_merchants_in_background():
         from backend.models.user import User
         from backend.models.merchant import MerchantProfile
         from backend.models.product import Product
+        from backend.utils.cache import invalidate_products
 
         with app.app_context():
             print("🏪 Checking for merchants...")
@@ -193,6 +194,7 @@ def ensure_merchants_in_background():
 
                     if assigned_count > 0:
                         db.session.commit()
+                        invalidate_products()
                         print(f"✅ Assigned merchants to {assigned_count} products")
     except Exception as e:
         print(f"⚠️  Warning: Could not ensure merchants: {e}")
@@ -0,0 +1,48 @@
+"""
+Test fixtures
+Tests run against a real Postgres database named by TEST_DATABASE_URL, whose
+tables are dropped and recreated for every test, so never point it at a
+database you care about. Without it, the database tests are skipped.
+"""
+
+import os
+import pytest
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+
+
+@pytest.fixture(scope="session")
+def app():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL is not set")
+
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["AUTO_MIGRATE"] = "false"
+    os.environ.pop("VERCEL", None)
+
+    from sqlalchemy import text
+    from backend.app import create_app, db
+
+    app = create_app()
+    app.config["TESTING"] = True
+    with app.app_context():
+        # Required by the products table's trigram index, as in 0001_baseline
+        with db.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    return app
+
+
+@pytest.fixture
+def db(app):
+    from backend.app import db
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield db
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app, db):
+    return app.test_client()
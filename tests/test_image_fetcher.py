@@ -0,0 +1,99 @@
+"""ImageFetcher against a local stub of the Custom Search API: rate limiting, retries and streaming"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from backend.utils import image_search
+from backend.utils.image_search import ImageFetcher
+from backend.utils.lookup_cache import LookupCache
+
+
+class StubSearchHandler(BaseHTTPRequestHandler):
+    """Answers like the Custom Search API; scripted (status, headers) replies per query come first"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query).get('q', [''])[0]
+        server = self.server
+        with server.lock:
+            server.requests.append((time.monotonic(), query))
+            scripted = server.scripts.get(query)
+            status, headers = scripted.pop(0) if scripted else (server.default_status, {})
+
+        body = b''
+        if status == 200:
+            body = json.dumps({'items': [{'link': f'http://images.test/{query}.jpg'}]}).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubSearchHandler)
+    server.lock = threading.Lock()
+    server.requests = []
+    server.scripts = {}
+    server.default_status = 200
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    monkeypatch.setattr(image_search, 'GOOGLE_API_URL', f'http://127.0.0.1:{server.server_port}/customsearch/v1')
+    # A fresh lookup cache, so every lookup reaches the stub
+    monkeypatch.setattr(image_search, 'lookup_cache', LookupCache(path=str(tmp_path / 'lookups.sqlite3')))
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _fetcher(**options):
+    return ImageFetcher(api_key='key', search_engine_id='engine', **options)
+
+
+def test_requests_to_one_host_respect_the_rate_limit(stub):
+    names = [f'product-{i}' for i in range(6)]
+    results = dict(_fetcher(workers=6, rate=10.0, burst=1).fetch(names))
+
+    assert set(results) == set(names)
+    times = sorted(at for at, _ in stub.requests)
+    assert len(times) == len(names)
+    # burst=1 at 10/s: six requests need at least five refills of 0.1s
+    assert times[-1] - times[0] >= 0.45
+
+
+def test_retries_429_and_5xx_with_backoff_and_retry_after(stub):
+    stub.scripts['flaky'] = [(503, {}), (429, {'Retry-After': '1'})]
+    fetcher = _fetcher(workers=1, rate=100.0, retries=3, backoff=0.05)
+
+    assert fetcher.lookup('flaky') == 'http://images.test/flaky.jpg'
+
+    times = [at for at, query in stub.requests if query == 'flaky']
+    assert len(times) == 3
+    # Exponential backoff after the 503, then Retry-After (1s) outweighs the 0.1s backoff
+    assert times[1] - times[0] >= 0.05
+    assert times[2] - times[1] >= 1.0
+
+
+def test_every_product_is_streamed_and_failures_are_reported(stub, capsys):
+    stub.scripts['broken'] = [(500, {})] * 2
+    names = ['lamp', 'broken', 'chair', 'desk']
+    results = list(_fetcher(workers=2, rate=100.0, retries=1, backoff=0.01).fetch(iter(names)))
+
+    assert sorted(name for name, _ in results) == sorted(names)
+    urls = dict(results)
+    assert urls['lamp'] == 'http://images.test/lamp.jpg'
+    # The failed lookup still yields, with the generated fallback image, and says why
+    assert urls['broken'] == image_search._get_image_from_unsplash('broken')
+    assert "Error fetching image via API for 'broken'" in capsys.readouterr().out
+    assert [query for _, query in stub.requests].count('broken') == 2
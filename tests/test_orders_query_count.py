@@ -0,0 +1,69 @@
+"""GET /api/orders/ must cost the same number of queries however many orders a user has"""
+
+from decimal import Decimal
+from sqlalchemy import event
+
+
+# Lean order list: the orders, then one selectinload for their items and one for the items' products
+ORDER_LIST_QUERIES = 3
+
+
+def _create_user(db, orders, items_per_order=3):
+    from backend.models.order import Order, OrderItem
+    from backend.models.product import Product
+    from backend.models.user import User
+
+    user = User(username="shopper", email="shopper@example.com")
+    user.set_password("password")
+    db.session.add(user)
+
+    for number in range(orders):
+        # Distinct products per order: shared ones would come from the identity map
+        # after the first lazy load and hide a missing product batch
+        products = [
+            Product(name=f"Product {number}-{i}", price=Decimal("9.99"), stock=10)
+            for i in range(items_per_order)
+        ]
+        db.session.add_all(products)
+        db.session.flush()
+        order = Order(user_id=user.id, total_amount=Decimal("29.97"), shipping_address="1 Main St")
+        order.items = [OrderItem(product_id=product.id, quantity=1, price=product.price) for product in products]
+        db.session.add(order)
+    user_id = user.id
+    db.session.commit()
+    return user_id
+
+
+def _count_order_list_queries(client, db, user_id):
+    with client.session_transaction() as session:
+        session["user_id"] = user_id
+    # Warm up first: the session user is looked up once, then cached for a while
+    client.get("/api/orders/")
+
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", count)
+    try:
+        response = client.get("/api/orders/")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", count)
+
+    assert response.status_code == 200
+    return len(response.get_json()), statements
+
+
+def test_order_list_query_count_is_constant(client, db):
+    counts = {}
+    for orders in (1, 10):
+        db.session.remove()
+        db.drop_all()
+        db.create_all()
+        user_id = _create_user(db, orders)
+        returned, statements = _count_order_list_queries(client, db, user_id)
+        assert returned == orders
+        counts[orders] = len(statements)
+
+    assert counts == {1: ORDER_LIST_QUERIES, 10: ORDER_LIST_QUERIES}, counts